@@ -0,0 +1,153 @@
+"""Utilidades compartidas de los benchmarks: base de datos temporal, generador de datos y reportes.
+
+La base por defecto es un archivo SQLite temporal. Para medir contra SQL Server (u otra base
+de pruebas) se indica su URL en BENCH_DATABASE_URL; el esquema se crea si no existe.
+Este módulo debe importarse antes que `database` para que DATABASE_URL apunte a la base de pruebas.
+"""
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="akari-bench-"), "bench.db")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Category, Client, Product, ProductCategory, Provider, User, Ticket, CartTransaction  # noqa: E402
+import rollups  # noqa: E402
+
+CHUNK = 50_000
+
+# Contraseña de todos los usuarios generados (para el escenario de login)
+PASSWORD = "bench"
+
+CATEGORIES = 20
+PRODUCTS = 2000
+CLIENTS = 500
+USERS = 50
+WORDS = ["taza", "vaso", "plato", "cuchara", "tenedor", "jarra", "olla", "sarten", "bowl", "mantel",
+         "servilleta", "copa", "botella", "termo", "charola"]
+COLORS = ["rojo", "azul", "verde", "negro", "blanco", "gris", "rosa", "amarillo"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# Generar catálogo, usuarios, clientes y `days` días de tickets con sus líneas de carrito
+def generate(transactions, days=3 * 365, products=PRODUCTS, clients=CLIENTS, users=USERS, lines_per_ticket=4,
+             seed=7):
+    from security import pwd_context
+
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=days)
+    Base.metadata.create_all(bind=engine)
+    password = pwd_context.hash(PASSWORD)
+
+    with engine.begin() as conn:
+        conn.execute(insert(Provider), [{"Name": "Proveedor"}])
+        conn.execute(insert(Category), [{"name": f"Categoría {i}"} for i in range(1, CATEGORIES + 1)])
+        conn.execute(insert(User), [
+            {"Username": f"user{i}", "Password": password, "User_type": "cajero", "Phone": "0"}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(insert(Client), [{"Name": f"Cliente {i}"} for i in range(1, clients + 1)])
+        conn.execute(insert(Product), [
+            {"Product_name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}", "Quantity": 1_000_000,
+             "Color": rng.choice(COLORS), "SKU": f"SKU{i:06d}", "ID_provider": 1,
+             "Price_Sell": rng.randint(10, 500), "Price_Buy": 5, "Image_URL": ""}
+            for i in range(1, products + 1)
+        ])
+        conn.execute(insert(ProductCategory), [
+            {"ID_Product": i, "ID_Category": category}
+            for i in range(1, products + 1)
+            for category in {rng.randint(1, CATEGORIES), rng.randint(1, CATEGORIES)}
+        ])
+
+    tickets, lines = [], []
+    ticket_id = 0
+    for transaction_id in range(1, transactions + 1):
+        if transaction_id % lines_per_ticket == 1 or lines_per_ticket == 1:
+            ticket_id += 1
+            created = datetime.combine(start + timedelta(days=rng.randrange(days)), datetime.min.time()) \
+                + timedelta(seconds=rng.randrange(86400))
+            tickets.append({"ID_ticket": ticket_id, "ID_client": rng.randint(1, clients),
+                            "ID_user": rng.randint(1, users), "Created_at": created,
+                            "Prev_Price": 0, "Final_Price": rng.randint(10, 2000)})
+        quantity = rng.randint(1, 5)
+        lines.append({"ID_User": tickets[-1]["ID_user"], "ID_Product": rng.randint(1, products),
+                      "Quantity": quantity, "Total_amount": quantity * 25, "Payment_method": "efectivo",
+                      "Order_date": tickets[-1]["Created_at"].date(), "Order_status": "Completado",
+                      "ID_Ticket": ticket_id})
+        if len(lines) >= CHUNK:
+            flush(tickets, lines)
+    flush(tickets, lines)
+
+    with SessionLocal() as db:
+        rollups.rebuild(db)
+        db.commit()
+
+
+def flush(tickets, lines):
+    with engine.begin() as conn:
+        if tickets:
+            conn.execute(insert(Ticket), tickets)
+        if lines:
+            conn.execute(insert(CartTransaction), lines)
+    tickets.clear()
+    lines.clear()
+
+
+def random_range(rng, days=3 * 365):
+    date_to = date.today() - timedelta(days=rng.randrange(days // 2))
+    date_from = date_to - timedelta(days=rng.randint(30, 365))
+    return date_from, date_to
+
+
+def measure(fn, requests):
+    samples = []
+    for _ in range(requests):
+        began = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return samples
+
+
+def summarize(samples, seconds=None):
+    summary = {
+        "n": len(samples),
+        "p50": statistics.median(samples),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
+    if seconds:
+        summary["rps"] = len(samples) / seconds
+    return summary
+
+
+def report(name, samples, seconds=None, baseline=None):
+    summary = summarize(samples, seconds)
+    line = (f"{name:<34} n={summary['n']:<5} p50={summary['p50']:8.2f} ms  "
+            f"p95={summary['p95']:8.2f} ms  p99={summary['p99']:8.2f} ms")
+    if "rps" in summary:
+        line += f"  {summary['rps']:8.1f} req/s"
+    if baseline and name in baseline:
+        line += f"  (p95 {summary['p95'] / baseline[name]['p95'] - 1:+.0%} vs baseline)"
+    print(line)
+    return summary
+
+
+def save(results, path):
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2, default=str)
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
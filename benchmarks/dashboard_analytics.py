@@ -0,0 +1,67 @@
+"""Benchmark de /dashboard/monthly_sales y /dashboard/category_stats.
+
+Genera un catálogo y un historial sintético (por defecto un millón de CartTransactions) en
+una base SQLite temporal, reconstruye los resúmenes diarios y mide la latencia de los
+endpoints con rangos de fechas aleatorios. Como referencia también mide la misma
+agregación por categoría directamente sobre CartTransactions.
+
+Uso: python -m benchmarks.dashboard_analytics [--transactions 1000000] [--requests 200]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import DB_PATH, generate, measure, random_range, report
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+
+from database import SessionLocal
+from models import ProductCategory, CartTransaction
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    generate(args.transactions)
+    print(f"Generated {args.transactions} transactions in {time.perf_counter() - began:.1f} s ({DB_PATH})")
+
+    import main as app_module
+    client = TestClient(app_module.app)
+    rng = random.Random(11)
+
+    def monthly():
+        date_from, date_to = random_range(rng)
+        assert client.get("/dashboard/monthly_sales", params={"from": date_from, "to": date_to}).status_code == 200
+
+    def category():
+        date_from, date_to = random_range(rng)
+        assert client.get("/dashboard/category_stats", params={"from": date_from, "to": date_to}).status_code == 200
+
+    # Referencia: la agregación por categoría directamente sobre CartTransactions
+    def category_raw():
+        date_from, date_to = random_range(rng)
+        with SessionLocal() as db:
+            db.query(
+                ProductCategory.ID_Category,
+                func.sum(CartTransaction.Quantity),
+                func.sum(CartTransaction.Total_amount)
+            ).join(
+                ProductCategory, CartTransaction.ID_Product == ProductCategory.ID_Product
+            ).filter(
+                CartTransaction.Order_status == "Completado",
+                CartTransaction.Order_date >= date_from,
+                CartTransaction.Order_date < date_to
+            ).group_by(ProductCategory.ID_Category).all()
+
+    report("GET /dashboard/monthly_sales", measure(monthly, args.requests))
+    report("GET /dashboard/category_stats", measure(category, args.requests))
+    report("category stats over CartTransactions", measure(category_raw, max(args.requests // 20, 5)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Pruebas de carga por escenarios contra la app ASGI en el mismo proceso.
+
+Genera una base sintética (ver benchmarks.common) y ejecuta cada escenario con varios
+clientes concurrentes durante un tiempo fijo, reportando el rendimiento (req/s) y
+p50/p95/p99 de cada endpoint:
+
+- login: tormenta de inicios de sesión (bcrypt en el servicio de hash)
+- checkout: armar un carrito de 1 a 5 líneas y cobrarlo
+- catalog: listar, filtrar, buscar y escanear productos
+- dashboard: refrescar los reportes con rangos de fechas aleatorios
+
+Para comparar antes y después de un cambio: guardar con --output y comparar con --baseline.
+
+Uso: python -m benchmarks.load [--transactions 200000] [--scenarios login,checkout,catalog,dashboard]
+     [--concurrency 8] [--duration 10] [--output results.json] [--baseline results.json]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from benchmarks.common import CATEGORIES, CLIENTS, DB_PATH, PASSWORD, PRODUCTS, USERS, WORDS, generate, load, \
+    random_range, report, save
+from database import async_engine
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = Counter()
+
+    async def request(self, client, name, method, url, expect=200, **kwargs):
+        began = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.samples[name].append((time.perf_counter() - began) * 1000)
+        if response.status_code != expect:
+            self.errors[f"{name} -> {response.status_code}"] += 1
+        return response
+
+
+async def login(client, recorder, rng, worker):
+    await recorder.request(client, "POST /auth/login", "POST", "/auth/login",
+                           json={"Username": f"user{rng.randint(1, USERS)}", "Password": PASSWORD})
+
+
+async def checkout(client, recorder, rng, worker):
+    # Cada cliente concurrente cobra con su propio usuario (un carrito por caja)
+    user = worker % USERS + 1
+    for _ in range(rng.randint(1, 5)):
+        await recorder.request(client, "POST /payments/cart", "POST", "/payments/cart", expect=201, json={
+            "ID_User": user, "ID_Product": rng.randint(1, PRODUCTS), "Quantity": rng.randint(1, 3),
+            "Payment_method": "efectivo"
+        })
+    await recorder.request(client, "POST /payments/checkout", "POST", "/payments/checkout", expect=201,
+                           json={"ID_client": rng.randint(1, CLIENTS), "ID_user": user})
+
+
+async def catalog(client, recorder, rng, worker):
+    await recorder.request(client, "GET /pos/products (page)", "GET", "/pos/products",
+                           params={"after": rng.randint(0, PRODUCTS - 50), "limit": 50})
+    await recorder.request(client, "GET /pos/products?category", "GET", "/pos/products",
+                           params={"category": rng.randint(1, CATEGORIES)})
+    await recorder.request(client, "GET /pos/categories", "GET", "/pos/categories")
+    await recorder.request(client, "GET /pos/products/search", "GET", "/pos/products/search",
+                           params={"q": f"{rng.choice(WORDS)} {rng.choice(WORDS)[:3]}"})
+    await recorder.request(client, "GET /pos/products/scan/{sku}", "GET",
+                           f"/pos/products/scan/SKU{rng.randint(1, PRODUCTS):06d}")
+
+
+async def dashboard(client, recorder, rng, worker):
+    for name in ("total_sales", "top_items", "top_clients"):
+        await recorder.request(client, f"GET /dashboard/{name}", "GET", f"/dashboard/{name}")
+    for name in ("monthly_sales", "category_stats"):
+        date_from, date_to = random_range(rng)
+        await recorder.request(client, f"GET /dashboard/{name}", "GET", f"/dashboard/{name}",
+                               params={"from": date_from, "to": date_to})
+
+
+SCENARIOS = {"login": login, "checkout": checkout, "catalog": catalog, "dashboard": dashboard}
+
+
+async def run(app, scenario, concurrency, duration, seed=11):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Los endpoints del punto de venta requieren token
+        response = await client.post("/auth/login", json={"Username": "user1", "Password": PASSWORD})
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+        # Una vuelta sin medir para cargar cachés e índices
+        await scenario(client, Recorder(), random.Random(seed), 0)
+
+        recorder = Recorder()
+        deadline = time.perf_counter() + duration
+
+        async def worker(index):
+            rng = random.Random(seed * 1000 + index)
+            iterations = 0
+            while time.perf_counter() < deadline:
+                await scenario(client, recorder, rng, index)
+                iterations += 1
+            return iterations
+
+        began = time.perf_counter()
+        iterations = sum(await asyncio.gather(*(worker(index) for index in range(concurrency))))
+        elapsed = time.perf_counter() - began
+
+    # Las conexiones asíncronas pertenecen a este event loop; cada escenario usa uno nuevo
+    await async_engine.dispose()
+    return recorder, iterations, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--baseline", help="compare with results saved by a previous run")
+    parser.add_argument("--slow-log", action="store_true", help="show the slow request log")
+    args = parser.parse_args()
+
+    # Bajo carga casi todo supera SLOW_REQUEST_MS en SQLite; el registro solo se muestra si se pide
+    if not args.slow_log:
+        logging.getLogger("akari.slow").setLevel(logging.ERROR)
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {sorted(unknown)}")
+
+    began = time.perf_counter()
+    generate(args.transactions)
+    print(f"Generated {args.transactions} transactions in {time.perf_counter() - began:.1f} s ({DB_PATH})")
+
+    import main as app_module
+    baseline = load(args.baseline) if args.baseline else {}
+    results = {}
+
+    for name in names:
+        recorder, iterations, elapsed = asyncio.run(run(app_module.app, SCENARIOS[name], args.concurrency,
+                                                        args.duration))
+        print(f"\n[{name}] {iterations} iterations in {elapsed:.1f} s ({iterations / elapsed:.1f}/s, "
+              f"concurrency {args.concurrency})")
+
+        previous = baseline.get(name, {}).get("requests")
+        results[name] = {
+            "iterations_per_second": iterations / elapsed,
+            "errors": dict(recorder.errors),
+            "requests": {request: report(request, samples, elapsed, previous)
+                         for request, samples in recorder.samples.items()},
+        }
+        for error, count in recorder.errors.items():
+            print(f"  error {error}: {count}")
+
+    if args.output:
+        save(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
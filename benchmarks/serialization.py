@@ -0,0 +1,95 @@
+"""Benchmark del costo de CPU de serializar listados grandes (por cada 10k filas).
+
+Compara, para CartTransactionResponse y ProductResponse, el camino anterior (objetos del ORM
+validados por el response_model de FastAPI y codificados con json de la biblioteca estándar)
+con el actual (tuplas de columnas a diccionarios y serializador TypeAdapter precompilado que
+genera el JSON en pydantic-core). También mide GET /payments/cart completo.
+
+Uso: python -m benchmarks.serialization [--rows 10000] [--repeat 10]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+
+from benchmarks.common import DB_PATH, PASSWORD, generate
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.testclient import TestClient
+from fastapi.utils import create_model_field
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import CartTransaction, Product
+from pagination import as_dicts, render_page, schema_columns
+from schemas import CartTransactionResponse, ProductResponse
+
+PER_ROWS = 10_000
+
+
+# Tiempo de CPU (ms) de cada repetición, escalado a 10k filas
+def cpu(fn, repeat, rows):
+    samples = []
+    for _ in range(repeat):
+        began = time.process_time()
+        fn()
+        samples.append((time.process_time() - began) * 1000 * PER_ROWS / rows)
+    return samples
+
+
+def line(name, samples, baseline=None):
+    text = f"{name:<44} median={statistics.median(samples):8.1f} ms  min={min(samples):8.1f} ms  per 10k rows"
+    if baseline:
+        text += f"  ({statistics.median(baseline) / statistics.median(samples):.1f}x faster)"
+    print(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=PER_ROWS)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    generate(args.rows, products=args.rows)
+    print(f"Generated {args.rows} transactions and products ({DB_PATH})")
+
+    for model, schema in ((CartTransaction, CartTransactionResponse), (Product, ProductResponse)):
+        key = next(iter(model.__table__.primary_key.columns))
+        field = create_model_field(name="response", type_=List[schema], mode="serialization")
+
+        with SessionLocal() as db:
+            # Antes: cargar objetos del ORM, validarlos con el response_model y codificar con json
+            def before():
+                db.expunge_all()
+                rows = db.scalars(select(model).order_by(key)).all()
+                content = asyncio.run(serialize_response(field=field, response_content=rows, is_coroutine=True))
+                return JSONResponse(content).body
+
+            # Ahora: tuplas de columnas a diccionarios y JSON con el serializador precompilado
+            def after():
+                rows = as_dicts(db.execute(select(*schema_columns(model, schema)).order_by(key)))
+                return render_page(rows, key, None, schema)[0]
+
+            # Ambos caminos deben producir el mismo JSON
+            assert json.loads(before()) == json.loads(after())
+            baseline = cpu(before, args.repeat, args.rows)
+            line(f"{schema.__name__} before", baseline)
+            line(f"{schema.__name__} after", cpu(after, args.repeat, args.rows), baseline)
+
+    import main as app_module
+    client = TestClient(app_module.app)
+    token = client.post("/auth/login", json={"Username": "user1", "Password": PASSWORD}).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    def endpoint():
+        assert client.get("/payments/cart").status_code == 200
+
+    endpoint()
+    line("GET /payments/cart (all rows)", cpu(endpoint, args.repeat, args.rows))
+
+
+if __name__ == "__main__":
+    main()
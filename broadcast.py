@@ -0,0 +1,160 @@
+import asyncio
+import json
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from config import WS_QUEUE_SIZE, WS_HEARTBEAT
+
+# Temas disponibles para suscribirse
+TOPICS = ("sales", "stock", "low_stock", "catalog")
+
+PING = json.dumps({"type": "ping"})
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class Subscriber:
+    def __init__(self, websocket: WebSocket, queue_size):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.topics = set()
+        self.sender = None
+
+
+# Hub de difusión: cada mensaje se codifica una sola vez y se encola a cada suscriptor.
+# Las colas son acotadas; un cliente que no alcanza a leer se desconecta en lugar de acumular memoria.
+class BroadcastHub:
+    def __init__(self, queue_size=WS_QUEUE_SIZE, heartbeat=WS_HEARTBEAT):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._subscribers = {topic: set() for topic in TOPICS}
+        self._connections = set()
+        self._loop = None
+        self._lock = threading.Lock()
+
+    # Publicar desde cualquier hilo (los endpoints síncronos corren en el threadpool)
+    def publish(self, topic, payload):
+        loop = self._loop
+        if loop is None or not self._subscribers.get(topic):
+            return
+
+        message = json.dumps({"type": topic, "data": payload}, default=_default)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            self._dispatch(topic, message)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, topic, message)
+
+    def _dispatch(self, topic, message):
+        with self._lock:
+            self.published += 1
+        for subscriber in list(self._subscribers.get(topic, ())):
+            try:
+                subscriber.queue.put_nowait(message)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def _drop(self, subscriber):
+        self.dropped += 1
+        self._disconnect(subscriber)
+        asyncio.ensure_future(self._close(subscriber, status.WS_1013_TRY_AGAIN_LATER))
+
+    async def _close(self, subscriber, code):
+        try:
+            await subscriber.websocket.close(code=code)
+        except (RuntimeError, WebSocketDisconnect):
+            pass
+
+    def _subscribe(self, subscriber, topics):
+        for topic in topics:
+            if topic in self._subscribers:
+                self._subscribers[topic].add(subscriber)
+                subscriber.topics.add(topic)
+
+    def _unsubscribe(self, subscriber, topics):
+        for topic in topics:
+            self._subscribers.get(topic, set()).discard(subscriber)
+            subscriber.topics.discard(topic)
+
+    def _disconnect(self, subscriber):
+        self._unsubscribe(subscriber, list(subscriber.topics))
+        self._connections.discard(subscriber)
+        if subscriber.sender:
+            subscriber.sender.cancel()
+
+    # Atender una conexión: ?topics=sales,stock y mensajes {"subscribe": [...]} / {"unsubscribe": [...]}
+    async def serve(self, websocket: WebSocket):
+        self._loop = asyncio.get_running_loop()
+        await websocket.accept()
+
+        subscriber = Subscriber(websocket, self.queue_size)
+        topics = websocket.query_params.get("topics")
+        self._subscribe(subscriber, topics.split(",") if topics else TOPICS)
+        self._connections.add(subscriber)
+        subscriber.sender = asyncio.create_task(self._send_loop(subscriber))
+
+        try:
+            await self._receive_loop(subscriber)
+        except (WebSocketDisconnect, asyncio.CancelledError):
+            pass
+        finally:
+            self._disconnect(subscriber)
+
+    # Sin mensajes durante `heartbeat` segundos se envía un ping de aplicación (mantiene abiertos los
+    # proxies con tiempo de inactividad). La detección de conexiones muertas la hace el servidor con
+    # los ping/pong del protocolo (uvicorn --ws-ping-interval/--ws-ping-timeout).
+    async def _send_loop(self, subscriber):
+        websocket = subscriber.websocket
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    message = PING
+                await websocket.send_text(message)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+    async def _receive_loop(self, subscriber):
+        websocket = subscriber.websocket
+        # Los clientes que solo escuchan no envían nada: no hay tiempo límite de inactividad
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                continue
+
+            self._subscribe(subscriber, message.get("subscribe") or [])
+            self._unsubscribe(subscriber, message.get("unsubscribe") or [])
+
+    def stats(self):
+        return {
+            "connections": len(self._connections),
+            "subscribers": {topic: len(subscribers) for topic, subscribers in self._subscribers.items()},
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+hub = BroadcastHub()
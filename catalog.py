@@ -0,0 +1,281 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from config import CATALOG_INDEX_TTL
+from database import SessionLocal
+from models import Product
+from schemas import ProductResponse
+
+# Campos indexados para la búsqueda y su peso en el ranking
+SEARCH_FIELDS = (("SKU", 4), ("Product_name", 3), ("Color", 1))
+
+# Calidad de cada tipo de coincidencia
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.5
+
+# Máximo de términos a expandir por prefijo o por similitud para una palabra de la consulta
+MAX_EXPANSIONS = 200
+
+# Los trigramas presentes en más palabras que esto no distinguen nada y se ignoran
+MAX_GRAM_TERMS = 5000
+
+
+def _serialize(product):
+    return ProductResponse.model_validate(product).model_dump()
+
+
+# Normalizar texto: minúsculas, sin acentos, dividido en palabras alfanuméricas
+def tokenize(text):
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def _trigrams(token):
+    padded = f"^{token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Distancia de edición con corte: devuelve max_distance + 1 si se excede
+def _edit_distance(a, b, max_distance):
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+# Índice en memoria SKU -> producto para el escáner de códigos de barras
+class SkuIndex:
+    def __init__(self):
+        self._by_sku = {}
+        self._sku_of = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, products):
+        by_sku, sku_of = {}, {}
+        for data in products:
+            sku = (data["SKU"] or "").strip()
+            if sku:
+                by_sku[sku] = data
+                sku_of[data["ID_product"]] = sku
+
+        with self._lock:
+            self._by_sku, self._sku_of = by_sku, sku_of
+
+    def put(self, data):
+        sku = (data["SKU"] or "").strip()
+        with self._lock:
+            self._discard(data["ID_product"])
+            if sku:
+                self._by_sku[sku] = data
+                self._sku_of[data["ID_product"]] = sku
+
+    def remove(self, product_id):
+        with self._lock:
+            self._discard(product_id)
+
+    def _discard(self, product_id):
+        sku = self._sku_of.pop(product_id, None)
+        if sku is not None and self._by_sku.get(sku, {}).get("ID_product") == product_id:
+            del self._by_sku[sku]
+
+    def get(self, sku):
+        return self._by_sku.get(sku.strip())
+
+    def get_many(self, skus):
+        by_sku = self._by_sku
+        return {sku: by_sku.get(sku.strip()) for sku in skus}
+
+
+# Índice invertido de palabras (con lista ordenada para prefijos y trigramas para errores de tipeo)
+class SearchIndex:
+    def __init__(self):
+        self._products = {}
+        self._tokens_of = {}
+        self._postings = {}
+        self._terms = []
+        self._trigrams = defaultdict(set)
+        self._lock = threading.RLock()
+
+    # Se construye un índice nuevo aparte y se reemplaza de una vez (las búsquedas no se bloquean)
+    def rebuild(self, products):
+        fresh = SearchIndex()
+        for data in products:
+            fresh._add(data, sort=False)
+        fresh._terms.sort()
+
+        with self._lock:
+            self._products, self._tokens_of, self._postings = fresh._products, fresh._tokens_of, fresh._postings
+            self._terms, self._trigrams = fresh._terms, fresh._trigrams
+
+    def put(self, data):
+        with self._lock:
+            self._discard(data["ID_product"])
+            self._add(data)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._discard(product_id)
+
+    def _add(self, data, sort=True):
+        tokens = {}
+        for field, weight in SEARCH_FIELDS:
+            for token in tokenize(data[field]):
+                tokens[token] = max(tokens.get(token, 0), weight)
+
+        # El SKU completo (sin separadores) también se indexa como una sola palabra
+        compact_sku = "".join(tokenize(data["SKU"]))
+        if compact_sku:
+            tokens[compact_sku] = SEARCH_FIELDS[0][1]
+
+        product_id = data["ID_product"]
+        self._products[product_id] = data
+        self._tokens_of[product_id] = tokens
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if sort:
+                    bisect.insort(self._terms, token)
+                else:
+                    self._terms.append(token)
+                for gram in _trigrams(token):
+                    self._trigrams[gram].add(token)
+            postings[product_id] = weight
+
+    def _discard(self, product_id):
+        self._products.pop(product_id, None)
+        for token in self._tokens_of.pop(product_id, {}):
+            postings = self._postings[token]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+                del self._terms[bisect.bisect_left(self._terms, token)]
+                for gram in _trigrams(token):
+                    self._trigrams[gram].discard(token)
+
+    # Palabras del índice que coinciden con una palabra de la consulta y su calidad
+    def _expand(self, term, fuzzy):
+        matches = {}
+        if term in self._postings:
+            matches[term] = EXACT
+
+        start = bisect.bisect_left(self._terms, term)
+        for token in self._terms[start:start + MAX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            matches.setdefault(token, PREFIX)
+
+        # Tolerancia a errores de tipeo solo si la palabra no existe tal cual
+        if fuzzy and len(term) >= 3 and term not in self._postings:
+            max_distance = 1 if len(term) <= 5 else 2
+            shared = defaultdict(int)
+            for gram in _trigrams(term):
+                terms = self._trigrams.get(gram, ())
+                if len(terms) <= MAX_GRAM_TERMS:
+                    for token in terms:
+                        shared[token] += 1
+
+            candidates = heapq.nlargest(MAX_EXPANSIONS, shared.items(), key=lambda item: item[1])
+            for token, _ in candidates:
+                if token in matches:
+                    continue
+                distance = _edit_distance(term, token, max_distance)
+                if distance <= max_distance:
+                    matches[token] = FUZZY / distance
+
+        return matches
+
+    # Búsqueda por relevancia: todas las palabras de la consulta deben coincidir
+    def search(self, query, limit=20, fuzzy=True):
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            scores = None
+            for term in dict.fromkeys(terms):
+                term_scores = {}
+                for token, quality in self._expand(term, fuzzy).items():
+                    for product_id, weight in self._postings[token].items():
+                        score = quality * weight
+                        if score > term_scores.get(product_id, 0):
+                            term_scores[product_id] = score
+
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {product_id: score + term_scores[product_id]
+                              for product_id, score in scores.items() if product_id in term_scores}
+                if not scores:
+                    return []
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+            return [{**self._products[product_id], "score": round(score, 3)} for product_id, score in best]
+
+
+sku_index = SkuIndex()
+search_index = SearchIndex()
+_loaded_at = None
+_load_lock = threading.Lock()
+
+
+# Los índices se cargan completos al primer uso y cada CATALOG_INDEX_TTL segundos
+# (así se ven los cambios hechos por otros workers)
+def stale():
+    return _loaded_at is None or time.monotonic() - _loaded_at > CATALOG_INDEX_TTL
+
+
+def load(session: Session):
+    global _loaded_at
+    products = [_serialize(product) for product in session.scalars(select(Product).order_by(Product.ID_product))]
+    sku_index.rebuild(products)
+    search_index.rebuild(products)
+    _loaded_at = time.monotonic()
+
+
+# Recargar si está vencido (pensado para correr en un hilo con asyncio.to_thread).
+# Solo la primera carga espera; mientras otra petición recarga se usan los datos actuales.
+def refresh():
+    if not stale() or not _load_lock.acquire(blocking=_loaded_at is None):
+        return
+    try:
+        if stale():
+            with SessionLocal() as session:
+                load(session)
+    finally:
+        _load_lock.release()
+
+
+# Recargar siempre (p. ej. después de una importación masiva)
+def reload():
+    with _load_lock:
+        with SessionLocal() as session:
+            load(session)
+
+
+# Mantener los índices al crear, actualizar o eliminar un producto
+def index_product(product):
+    data = _serialize(product)
+    sku_index.put(data)
+    search_index.put(data)
+    return data
+
+
+def unindex_product(product_id):
+    sku_index.remove(product_id)
+    search_index.remove(product_id)
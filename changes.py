@@ -0,0 +1,112 @@
+import itertools
+from datetime import datetime
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import Category, Product, ProductCategory, PromotionalCode, SyncCounter, SyncTombstone
+
+# Tablas del catálogo que las cajas sincronizan (las existencias se envían en vivo por WebSocket
+# y los descuentos de inventario de las ventas no cambian la versión)
+TRACKED = (Product, Category, ProductCategory, PromotionalCode)
+
+COUNTER = "catalog"
+
+
+# Siguiente versión del catálogo: una sola por transacción. La fila del contador queda bloqueada
+# hasta el commit, así las versiones quedan en el mismo orden en que se confirman los cambios.
+def next_version(session: Session):
+    version = session.info.get("sync_version")
+    if version is not None:
+        return version
+
+    connection = session.connection()
+    version = connection.execute(
+        update(SyncCounter)
+        .where(SyncCounter.Name == COUNTER)
+        .values(Value=SyncCounter.Value + 1)
+        .returning(SyncCounter.Value)
+    ).scalar_one_or_none()
+
+    if version is None:
+        version = 1
+        connection.execute(insert(SyncCounter).values(Name=COUNTER, Value=version))
+
+    session.info["sync_version"] = version
+    return version
+
+
+# Última versión confirmada
+def current_version(session: Session):
+    return session.scalar(select(SyncCounter.Value).where(SyncCounter.Name == COUNTER)) or 0
+
+
+# Llave de una fila eliminada ("1" o "1:2" para llaves compuestas)
+def row_key(instance):
+    return ":".join(str(getattr(instance, column.key)) for column in instance.__table__.primary_key.columns)
+
+
+def parse_key(model, key):
+    columns = model.__table__.primary_key.columns
+    values = [int(value) for value in key.split(":")]
+    return values[0] if len(columns) == 1 else {column.key: value for column, value in zip(columns, values)}
+
+
+# Marcar con la versión de la transacción las filas del catálogo creadas o modificadas por el ORM
+# y registrar las eliminadas. Los INSERT/UPDATE en bloque deben usar next_version() directamente.
+@event.listens_for(Session, "before_flush")
+def _stamp_changes(session, flush_context, instances):
+    changed = [instance for instance in itertools.chain(session.new, session.dirty)
+               if isinstance(instance, TRACKED) and session.is_modified(instance, include_collections=False)]
+    deleted = [instance for instance in session.deleted if isinstance(instance, TRACKED)]
+    if not changed and not deleted:
+        return
+
+    version = next_version(session)
+    now = datetime.now()
+    for instance in changed:
+        instance.SyncVersion = version
+        instance.UpdatedAt = now
+    for instance in deleted:
+        session.add(SyncTombstone(
+            Table_name=instance.__table__.name,
+            Row_key=row_key(instance),
+            SyncVersion=version,
+            Deleted_at=now
+        ))
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _reset_version(session):
+    session.info.pop("sync_version", None)
+
+
+# Cambios del catálogo en (since, upto]. Sin versión previa se devuelve el catálogo completo.
+# La versión se lee antes que las filas: un cambio confirmado entre ambas lecturas se vuelve
+# a enviar en la siguiente sincronización, nunca se pierde.
+def changes(session: Session, since: int = 0):
+    upto = current_version(session)
+    full = not since or since > upto
+
+    def rows(model):
+        stmt = select(model)
+        if not full:
+            stmt = stmt.where(model.SyncVersion > since, model.SyncVersion <= upto)
+        key = next(iter(model.__table__.primary_key.columns))
+        return session.scalars(stmt.order_by(key)).all()
+
+    result = {"version": upto, "full": full, **{model.__tablename__: rows(model) for model in TRACKED}}
+
+    deleted = {model.__tablename__: [] for model in TRACKED}
+    if not full:
+        models = {model.__tablename__: model for model in TRACKED}
+        for table, key in session.execute(
+            select(SyncTombstone.Table_name, SyncTombstone.Row_key)
+            .where(SyncTombstone.SyncVersion > since, SyncTombstone.SyncVersion <= upto)
+            .order_by(SyncTombstone.ID_Tombstone)
+        ):
+            if table in models:
+                deleted[table].append(parse_key(models[table], key))
+    result["deleted"] = deleted
+    return result
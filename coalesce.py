@@ -0,0 +1,103 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+# Agrupa las cargas idénticas simultáneas en una sola (single-flight) y guarda el resultado:
+# - fresco durante `fresh` segundos: se devuelve sin consultar
+# - durante `stale` segundos más: se devuelve el valor anterior y se recalcula en segundo plano
+# - después: la siguiente petición recalcula y las que llegan mientras tanto esperan ese resultado
+class Coalescer:
+    def __init__(self, fresh, stale, maxsize=256, refresh_workers=2):
+        self.fresh = fresh
+        self.stale = stale
+        self.maxsize = maxsize
+        self.hits = 0
+        self.stale_hits = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="coalesce")
+
+    def get(self, key, loader, *args):
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry[0] if entry else None
+
+            if entry and age < self.fresh:
+                self.hits += 1
+                return entry[1]
+
+            call = self._inflight.get(key)
+            if entry and age < self.fresh + self.stale:
+                self.stale_hits += 1
+                if call is None:
+                    self.refreshes += 1
+                    self._inflight[key] = _Call()
+                    self._executor.submit(self._load, key, loader, args)
+                return entry[1]
+
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if leader:
+            return self._load(key, loader, args)
+
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def _load(self, key, loader, args):
+        call = self._inflight[key]
+        try:
+            call.value = loader(*args)
+        except BaseException as error:
+            call.error = error
+            raise
+        else:
+            with self._lock:
+                self.loads += 1
+                self._entries[key] = (time.monotonic(), call.value)
+                if len(self._entries) > self.maxsize:
+                    self._evict()
+            return call.value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    # Quitar las entradas vencidas (y si no alcanza, las más antiguas)
+    def _evict(self):
+        limit = time.monotonic() - self.fresh - self.stale
+        for key in [key for key, (loaded_at, _) in self._entries.items() if loaded_at < limit]:
+            del self._entries[key]
+        while len(self._entries) > self.maxsize:
+            del self._entries[min(self._entries, key=lambda key: self._entries[key][0])]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "fresh": self.fresh,
+                "stale": self.stale,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "loads": self.loads,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "inflight": len(self._inflight),
+            }
@@ -11,3 +11,57 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 35))
+
+# Configuración del pool de conexiones
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# URL para el motor asíncrono (si no se define se deriva de DATABASE_URL)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Caché del catálogo de productos (tamaño máximo y segundos de vida)
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", 256))
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", 300))
+
+# Segundos máximos de validez de una ETag (acota datos obsoletos entre workers)
+ETAG_WINDOW = int(os.getenv("ETAG_WINDOW", 60))
+
+# Servicio de hash de contraseñas (costo de bcrypt, hilos dedicados y cola máxima)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", 4))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", 64))
+
+# Segundos antes de recargar los índices en memoria del catálogo (SKU y búsqueda)
+CATALOG_INDEX_TTL = int(os.getenv("CATALOG_INDEX_TTL", 300))
+
+# Segundos antes de recargar los códigos promocionales en memoria (también se recargan al vencer uno)
+PROMO_CODES_TTL = int(os.getenv("PROMO_CODES_TTL", 60))
+
+# WebSocket: mensajes pendientes por cliente y segundos sin mensajes antes de enviar un ping de aplicación
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", 100))
+WS_HEARTBEAT = int(os.getenv("WS_HEARTBEAT", 20))
+
+# Exportaciones: filas leídas por lote del cursor del servidor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+# Importación masiva de productos: filas por lote
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+
+# Métricas: peticiones más lentas que esto (ms) se registran con su SQL
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 500))
+
+# Autenticación: tokens decodificados y versiones de usuario en memoria (tamaño y segundos de vida)
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", 60))
+
+# Reportes del dashboard: segundos en que un resultado es fresco y segundos extra en que se sirve
+# mientras se recalcula en segundo plano
+DASHBOARD_FRESH = float(os.getenv("DASHBOARD_FRESH", 2))
+DASHBOARD_STALE = float(os.getenv("DASHBOARD_STALE", 30))
+
+# Idempotency-Key: respuestas guardadas (máximo) y segundos que se conservan
+IDEMPOTENCY_SIZE = int(os.getenv("IDEMPOTENCY_SIZE", 10000))
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 86400))
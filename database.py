@@ -1,19 +1,69 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
-from config import DATABASE_URL
+
+import metrics
+from config import DATABASE_URL, ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, \
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Drivers asíncronos equivalentes a los drivers síncronos
+ASYNC_DRIVERS = {
+    "mssql+pyodbc": "mssql+aioodbc",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def pool_options(url, asynchronous=False):
+    url = make_url(url)
+    # SQLite no usa QueuePool, así que solo aplicamos las opciones comunes
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+
+    # Pool que mide la espera por conexión (una base SQLite en memoria necesita su propio pool)
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        options["poolclass"] = metrics.TimedAsyncQueuePool if asynchronous else metrics.TimedQueuePool
+    return options
+
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
 
 # Crear el motor de base de datos
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 
 # Crear sesión con SQLAlchemy
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor y sesión asíncronos para los endpoints nativos (coroutines)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL or async_url(DATABASE_URL),
+    **pool_options(ASYNC_DATABASE_URL or DATABASE_URL, asynchronous=True)
+)
+
+# Conteo y tiempo de SQL por petición para /metrics
+metrics.instrument(engine)
+metrics.instrument(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # Base para los modelos
 Base = declarative_base()
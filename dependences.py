@@ -1,4 +1,16 @@
-from database import SessionLocal
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+
+from database import SessionLocal, AsyncSessionLocal
+from models import User
+from schemas import CurrentUser
+from security import credentials_error, decode_access_token, user_version, user_versions
+
+bearer = HTTPBearer(auto_error=False)
 
 # Obtener sesión de base de datos
 def get_db():
@@ -7,3 +19,57 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Obtener sesión asíncrona de base de datos
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Versión vigente del usuario desde la base de datos (se guarda en memoria)
+async def load_user_version(user_id):
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(select(User.UpdatedAt).where(User.ID_user == user_id))).first()
+    if row is None:
+        raise credentials_error()
+    version = user_version(row.UpdatedAt)
+    user_versions.set(user_id, version)
+    return version
+
+
+# Usuario autenticado a partir del token Bearer.
+# Los tokens verificados y la versión de cada usuario se guardan en memoria, así una petición
+# protegida no consulta la base; un cambio en el usuario (UpdatedAt) revoca sus tokens anteriores.
+async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> CurrentUser:
+    if credentials is None:
+        raise credentials_error("Not authenticated")
+
+    _, token_version, user = decode_access_token(credentials.credentials)
+
+    # Un token más nuevo que la versión en memoria se emitió después de un cambio hecho en otro
+    # worker: se vuelve a leer la versión antes de decidir
+    version = user_versions.get(user.ID_user)
+    if version is None or token_version > version:
+        version = await load_user_version(user.ID_user)
+
+    # Solo se revocan los tokens emitidos antes del último cambio del usuario
+    if token_version < version:
+        raise credentials_error("Token has been revoked")
+
+    return user
+
+
+# Rango de fechas [from, to) para los reportes; por defecto los últimos 365 días
+def date_range(date_from: Optional[date] = Query(None, alias="from"),
+               date_to: Optional[date] = Query(None, alias="to")):
+    date_to = date_to or date.today() + timedelta(days=1)
+    date_from = date_from or date_to - timedelta(days=365)
+
+    if date_from >= date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be earlier than 'to'"
+        )
+
+    return date_from, date_to
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from config import EXPORT_BATCH_SIZE
+from database import SessionLocal
+
+# Formatos de exportación y su tipo de contenido
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _json(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _encode_csv(columns, rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_text(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(columns, rows, header=False):
+    return "".join(json.dumps(dict(zip(columns, row)), default=_json) + "\n" for row in rows).encode()
+
+
+# Generar el archivo por lotes desde un cursor del servidor (la memoria no crece con el número de filas).
+# La sesión se abre aquí y no con Depends(get_db), que se cierra antes de enviar la respuesta.
+def stream_rows(stmt, fmt, compress=False):
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+    # wbits=31: formato gzip
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    with SessionLocal() as session:
+        result = session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+
+        if fmt == "csv":
+            chunk = encode(columns, [], header=True)
+            yield compressor.compress(chunk) if compressor else chunk
+
+        for rows in result.partitions():
+            chunk = encode(columns, rows)
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+
+    if compressor:
+        yield compressor.flush()
+
+
+# Respuesta de descarga; se comprime con gzip si el cliente lo acepta
+def export_response(request: Request, stmt, fmt, filename):
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"', "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(stream_rows(stmt, fmt, compress), media_type=FORMATS[fmt], headers=headers)
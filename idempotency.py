@@ -0,0 +1,175 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from config import IDEMPOTENCY_SIZE, IDEMPOTENCY_TTL
+
+# Métodos que aceptan Idempotency-Key
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Las respuestas más grandes que esto no se guardan (la clave se libera)
+MAX_STORED_BODY = 1024 * 1024
+
+MAX_KEY_LENGTH = 255
+
+
+class _Entry:
+    __slots__ = ("expires", "done", "fingerprint", "status", "headers", "body")
+
+    def __init__(self, expires):
+        self.expires = expires
+        self.done = False
+        self.fingerprint = self.status = self.headers = self.body = None
+
+
+# Respuestas por clave con tiempo de vida y tamaño máximo; todas las operaciones son O(1)
+# (las entradas se ordenan por inserción y todas viven lo mismo, así que las vencidas están al inicio)
+class IdempotencyStore:
+    def __init__(self, maxsize=IDEMPOTENCY_SIZE, ttl=IDEMPOTENCY_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.replays = 0
+        self.conflicts = 0
+        self.mismatches = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires >= now and len(self._entries) < self.maxsize:
+                break
+            del self._entries[key]
+
+    # Reservar la clave; si ya existe devuelve la entrada (en curso o terminada)
+    def begin(self, key):
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            self._entries[key] = _Entry(now + self.ttl)
+            return None
+
+    def complete(self, key, fingerprint, status_code, headers, body):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.fingerprint, entry.status, entry.headers, entry.body = fingerprint, status_code, headers, body
+            entry.done = True
+
+    def release(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "replays": self.replays,
+                "conflicts": self.conflicts,
+                "mismatches": self.mismatches,
+            }
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+# Middleware ASGI: una escritura repetida con el mismo Idempotency-Key devuelve la respuesta original
+# sin ejecutarse de nuevo. Solo se guardan las respuestas exitosas; si falla, el reintento se ejecuta.
+class IdempotencyMiddleware:
+    def __init__(self, app, prefixes=("/payments", "/pos"), store=None):
+        self.app = app
+        self.prefixes = tuple(prefixes)
+        self.store = store or idempotency_store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS \
+                or not scope["path"].startswith(self.prefixes):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        key = headers.get(b"idempotency-key")
+        if key is None:
+            return await self.app(scope, receive, send)
+
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"},
+                                    status_code=status.HTTP_400_BAD_REQUEST)
+            return await response(scope, receive, send)
+
+        # La clave vale solo para el mismo endpoint y las mismas credenciales
+        store_key = (scope["method"], scope["path"], headers.get(b"authorization"), key)
+        entry = self.store.begin(store_key)
+        if entry is not None:
+            return await self._existing(entry, scope, receive, send)
+
+        digest = hashlib.sha256()
+        captured = {"status": None, "headers": None, "chunks": [], "size": 0}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                digest.update(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                captured["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                captured["size"] += len(body)
+                if captured["size"] <= MAX_STORED_BODY:
+                    captured["chunks"].append(body)
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except BaseException:
+            self.store.release(store_key)
+            raise
+
+        if captured["status"] is not None and 200 <= captured["status"] < 300 and captured["size"] <= MAX_STORED_BODY:
+            self.store.complete(store_key, digest.hexdigest(), captured["status"], captured["headers"],
+                                b"".join(captured["chunks"]))
+        else:
+            self.store.release(store_key)
+
+    async def _existing(self, entry, scope, receive, send):
+        if not entry.done:
+            self.store.conflicts += 1
+            response = JSONResponse({"detail": "A request with this Idempotency-Key is still being processed"},
+                                    status_code=status.HTTP_409_CONFLICT, headers={"Retry-After": "1"})
+            return await response(scope, receive, send)
+
+        if hashlib.sha256(await _read_body(receive)).hexdigest() != entry.fingerprint:
+            self.store.mismatches += 1
+            response = JSONResponse({"detail": "Idempotency-Key was already used with a different request"},
+                                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            return await response(scope, receive, send)
+
+        self.store.replays += 1
+        await send({
+            "type": "http.response.start",
+            "status": entry.status,
+            "headers": entry.headers + [(b"idempotent-replayed", b"true")],
+        })
+        await send({"type": "http.response.body", "body": entry.body})
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,204 @@
+import csv
+import json
+import re
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from changes import next_version
+from config import IMPORT_CHUNK_SIZE
+from models import Category, Product, ProductCategory
+from schemas import ProductBase, ProductImportRow
+
+# Máximo de errores detallados en la respuesta (el total siempre se cuenta)
+MAX_REPORTED_ERRORS = 1000
+
+
+def _describe(error: ValidationError):
+    return "; ".join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in error.errors())
+
+
+# Leer el archivo fila por fila: devuelve (línea, registro, error)
+def _read_rows(stream, fmt):
+    if fmt == "csv":
+        for line, record in enumerate(csv.DictReader(stream), 2):
+            # Las celdas vacías no modifican el producto
+            record = {key.strip(): value.strip() for key, value in record.items()
+                      if key and isinstance(value, str) and value.strip()}
+            if "Categories" in record:
+                record["Categories"] = [value for value in re.split(r"[;|]", record["Categories"])
+                                        if value.strip()]
+            yield line, record, None
+    else:
+        for line, text in enumerate(stream, 1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError as error:
+                yield line, None, f"Invalid JSON: {error}"
+                continue
+            if not isinstance(record, dict):
+                yield line, None, "Expected a JSON object"
+                continue
+            yield line, record, None
+
+
+class _Import:
+    def __init__(self, session: Session):
+        self.session = session
+        self.category_ids = set(session.scalars(select(Category.ID_Category)))
+        self.rows = self.inserted = self.updated = self.linked = self.failed = 0
+        self.errors = []
+        # Productos creados o modificados y productos con categorías nuevas (se marcan al final con stamp)
+        self.changed = set()
+        self.relinked = set()
+
+    def fail(self, line, sku, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "SKU": sku, "error": message})
+
+    # Validar una fila; las filas repetidas del mismo SKU dentro del lote se combinan
+    def add(self, chunk, line, record, error):
+        self.rows += 1
+        if error:
+            return self.fail(line, None, error)
+
+        try:
+            row = ProductImportRow.model_validate(record)
+        except ValidationError as error:
+            return self.fail(line, record.get("SKU"), _describe(error))
+
+        sku = row.SKU.strip()
+        unknown = sorted(set(row.Categories) - self.category_ids)
+        if not sku:
+            return self.fail(line, row.SKU, "SKU is required")
+        if unknown:
+            return self.fail(line, sku, f"Unknown categories: {unknown}")
+
+        fields = row.model_dump(exclude_unset=True, exclude={"SKU", "Categories"})
+        if sku in chunk:
+            _, previous, categories = chunk[sku]
+            chunk[sku] = (line, {**previous, **fields}, categories | set(row.Categories))
+        else:
+            chunk[sku] = (line, fields, set(row.Categories))
+
+    # UPDATE por llave primaria con executemany, agrupando las filas que cambian las mismas columnas
+    def _update(self, updates):
+        products = Product.__table__
+        groups = defaultdict(list)
+        for values in updates:
+            groups[tuple(sorted(values))].append({f"b_{key}": value for key, value in values.items()})
+
+        for columns, rows in groups.items():
+            self.session.execute(
+                update(products)
+                .where(products.c.ID_product == bindparam("b_ID_product"))
+                .values({column: bindparam(f"b_{column}") for column in columns if column != "ID_product"}),
+                rows
+            )
+        self.updated += len(updates)
+
+    # Aplicar un lote: una consulta por SKU, INSERT y UPDATE en bloque y enlaces a categorías
+    def flush(self, chunk):
+        if not chunk:
+            return
+        session = self.session
+
+        # Si el SKU está repetido en la tabla se actualiza el producto más antiguo
+        existing = dict(session.execute(
+            select(Product.SKU, Product.ID_product)
+            .where(Product.SKU.in_(chunk))
+            .order_by(Product.ID_product.desc())
+        ).all())
+
+        inserts, updates = [], []
+        for sku, (line, fields, _) in chunk.items():
+            if sku in existing:
+                if fields:
+                    updates.append({"ID_product": existing[sku], **fields})
+                continue
+            try:
+                inserts.append(ProductBase.model_validate({**fields, "SKU": sku}).model_dump())
+            except ValidationError as error:
+                self.fail(line, sku, f"New product: {_describe(error)}")
+
+        if updates:
+            self._update(updates)
+            self.changed.update(values["ID_product"] for values in updates)
+        if inserts:
+            # INSERT a nivel de tabla: evita el costo por fila del INSERT masivo del ORM
+            products = Product.__table__
+            created = session.execute(
+                insert(products).returning(products.c.SKU, products.c.ID_product), inserts
+            ).all()
+            existing.update(created)
+            self.changed.update(product_id for _, product_id in created)
+            self.inserted += len(created)
+
+        links = {(existing[sku], category_id)
+                 for sku, (_, _, categories) in chunk.items() if sku in existing
+                 for category_id in categories}
+        if links:
+            product_ids = {product_id for product_id, _ in links}
+            links -= set(session.execute(
+                select(ProductCategory.ID_Product, ProductCategory.ID_Category)
+                .where(ProductCategory.ID_Product.in_(product_ids))
+            ).tuples())
+        if links:
+            session.execute(insert(ProductCategory.__table__),
+                            [{"ID_Product": product_id, "ID_Category": category_id}
+                             for product_id, category_id in links])
+            self.relinked.update(product_id for product_id, _ in links)
+            self.linked += len(links)
+
+        chunk.clear()
+
+    # Los INSERT/UPDATE a nivel de tabla no pasan por el ORM: la versión de sincronización se asigna
+    # después del último lote, así la fila del contador queda bloqueada solo hasta el commit y no
+    # durante toda la importación
+    def stamp(self):
+        if not self.changed and not self.relinked:
+            return
+        values = {"SyncVersion": next_version(self.session), "UpdatedAt": datetime.now()}
+
+        for table, column, ids in ((Product.__table__, "ID_product", self.changed),
+                                   (ProductCategory.__table__, "ID_Product", self.relinked)):
+            ids = sorted(ids)
+            for start in range(0, len(ids), IMPORT_CHUNK_SIZE):
+                self.session.execute(
+                    update(table)
+                    .where(table.c[column].in_(ids[start:start + IMPORT_CHUNK_SIZE]))
+                    .values(values)
+                )
+
+
+# Importar productos desde CSV o JSON Lines actualizando por SKU (sin confirmar la transacción)
+def import_products(session: Session, stream, fmt):
+    start = time.perf_counter()
+    job = _Import(session)
+    chunk = {}
+
+    for line, record, error in _read_rows(stream, fmt):
+        job.add(chunk, line, record, error)
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            job.flush(chunk)
+    job.flush(chunk)
+    job.stamp()
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": job.rows,
+        "inserted": job.inserted,
+        "updated": job.updated,
+        "linked": job.linked,
+        "failed": job.failed,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(job.rows / seconds, 1) if seconds else 0.0,
+        "errors": sorted(job.errors, key=lambda item: item["line"])
+    }
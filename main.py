@@ -1,18 +1,25 @@
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from starlette.middleware.cors import CORSMiddleware
 
-from database import Base, engine
-from routes import auth, pos, payments, dashboard, users
+import metrics
+from idempotency import IdempotencyMiddleware, idempotency_store
+from broadcast import hub
+from routes import auth, pos, payments, dashboard, users, sync
 
-# Inicializar base de datos
-Base.metadata.create_all(bind=engine)
+# El esquema de la base de datos se administra con migraciones: `alembic upgrade head`
 
 app = FastAPI(
     title="AKARI API",
     description="API para el sistema AKARI",
-    version="1.0.0"
+    version="1.0.0",
+    # Las respuestas JSON se codifican con orjson
+    default_response_class=ORJSONResponse
 )
 
+# Reintentos seguros de escrituras con el encabezado Idempotency-Key (dentro de CORS)
+app.add_middleware(IdempotencyMiddleware, prefixes=("/payments", "/pos"))
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +29,9 @@ app.add_middleware(
     allow_headers=["*"],  # Permite todos los encabezados
 )
 
+# Métricas de latencia, estado y SQL por ruta (expuestas en /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
 
 # Incluir routers
 app.include_router(auth.router, prefix="/auth")
@@ -29,14 +39,30 @@ app.include_router(pos.router, prefix="/pos")
 app.include_router(payments.router, prefix="/payments")
 app.include_router(dashboard.router, prefix="/dashboard")
 app.include_router(users.router, prefix="/users")
+app.include_router(sync.router, prefix="/sync")
 
-# WebSocket
+# WebSocket: actualizaciones en vivo por tema (sales, stock, low_stock, catalog)
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    while True:
-        data = await websocket.receive_text()
-        await websocket.send_text(f"Message received: {data}")
+    await hub.serve(websocket)
+
+
+# Estadísticas de las conexiones WebSocket
+@app.get("/ws/stats")
+def websocket_stats():
+    return hub.stats()
+
+# Estadísticas de las claves de idempotencia (respuestas repetidas, conflictos)
+@app.get("/idempotency/stats")
+def idempotency_stats():
+    return idempotency_store.stats()
+
+
+# Métricas en formato Prometheus
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 # Health check
 @app.get("/")
@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from config import SLOW_REQUEST_MS
+
+logger = logging.getLogger("akari.slow")
+
+# Límites de los histogramas (segundos y número de sentencias)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Sentencias SQL que se guardan por petición para el registro de peticiones lentas
+MAX_LOGGED_STATEMENTS = 50
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        return [f"{self.name}{{{_labels(self.labels, key)}}} {_number(value)}" if key else f"{self.name} {_number(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(labels) or ([0] * (len(self.buckets) + 1), 0)
+            counts[index] += 1
+            self._values[labels] = (counts, total + value)
+
+    def render(self):
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            prefix = _labels(self.labels, key)
+            prefix = f"{prefix}," if prefix else ""
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{prefix[:-1]}}} {_number(total)}")
+            lines.append(f"{self.name}_count{{{prefix[:-1]}}} {cumulative}")
+        return lines
+
+
+REQUESTS = Counter("akari_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+LATENCY = Histogram("akari_http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+IN_FLIGHT = Gauge("akari_http_requests_in_flight", "HTTP requests being served")
+SQL_STATEMENTS = Histogram("akari_http_request_sql_statements", "SQL statements per request", ("method", "route"),
+                           buckets=STATEMENT_BUCKETS)
+DB_TIME = Histogram("akari_http_request_db_seconds", "Time spent in the database per request", ("method", "route"))
+POOL_WAIT = Histogram("akari_db_pool_checkout_seconds", "Time waiting for a pooled connection", ("pool",))
+
+REGISTRY = (REQUESTS, LATENCY, IN_FLIGHT, SQL_STATEMENTS, DB_TIME, POOL_WAIT)
+
+
+# Texto en el formato de exposición de Prometheus
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Estadísticas SQL de la petición en curso (compartidas con el threadpool a través del contexto)
+class RequestStats:
+    __slots__ = ("statements", "db_time", "sql")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.sql = []
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+        if len(stats.sql) < MAX_LOGGED_STATEMENTS:
+            stats.sql.append((elapsed, statement))
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+# Registrar los eventos de tiempo de SQL en un motor (para el asíncrono: async_engine.sync_engine)
+def instrument(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# Pools que miden la espera para obtener una conexión
+class TimedQueuePool(QueuePool):
+    label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start, self.label)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    label = "async"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start, self.label)
+
+
+# Middleware ASGI: latencia, estado, peticiones en curso y SQL por ruta
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            _current.reset(token)
+
+            # Se usa la plantilla de la ruta (p. ej. /pos/products/{product_id}) para acotar las etiquetas
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            method = scope["method"]
+
+            REQUESTS.inc(method, route, status_code)
+            LATENCY.observe(elapsed, method, route)
+            SQL_STATEMENTS.observe(stats.statements, method, route)
+            DB_TIME.observe(stats.db_time, method, route)
+
+            if elapsed * 1000 >= SLOW_REQUEST_MS:
+                logger.warning(
+                    "Slow request %s %s -> %s in %.1f ms (%d SQL statements, %.1f ms in DB)\n%s",
+                    method, scope["path"], status_code, elapsed * 1000, stats.statements, stats.db_time * 1000,
+                    "\n".join(f"  [{duration * 1000:.1f} ms] {statement}" for duration, statement in stats.sql)
+                )
@@ -0,0 +1,45 @@
+import sqlalchemy as sa
+from alembic import context, op
+
+
+# Ediciones de SQL Server que permiten índices ONLINE: Enterprise/Developer, Azure SQL Database y
+# Managed Instance (SERVERPROPERTY('EngineEdition') = 3, 5 y 8). Standard y Express lo rechazan.
+ONLINE_EDITIONS = {3, 5, 8}
+
+
+def _supports_online(bind):
+    edition = bind.execute(sa.text("SELECT CAST(SERVERPROPERTY('EngineEdition') AS INT)")).scalar()
+    return edition in ONLINE_EDITIONS
+
+
+# Crear un índice sin bloquear la tabla: ONLINE en SQL Server (si la edición lo permite), CONCURRENTLY
+# en PostgreSQL. `where` (SQL) crea un índice filtrado.
+def create_index_online(name, table, columns, unique=False, include=None, where=None):
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "mssql" and not context.is_offline_mode() and _supports_online(bind):
+        statement = "CREATE {unique}INDEX [{name}] ON [{table}] ({columns}){include}{where} " \
+                    "WITH (ONLINE = ON)".format(
+            unique="UNIQUE " if unique else "",
+            name=name,
+            table=table,
+            columns=", ".join(f"[{column}]" for column in columns),
+            include=" INCLUDE ({})".format(", ".join(f"[{column}]" for column in include)) if include else "",
+            where=f" WHERE {where}" if where else "",
+        )
+        op.execute(statement)
+    elif dialect == "mssql":
+        op.create_index(name, table, columns, unique=unique, mssql_include=include or [],
+                        mssql_where=sa.text(where) if where else None)
+    elif dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True,
+                            postgresql_include=include or [],
+                            postgresql_where=sa.text(where) if where else None)
+    else:
+        op.create_index(name, table, columns, unique=unique, sqlite_where=sa.text(where) if where else None)
+
+
+def drop_index(name, table):
+    op.drop_index(name, table_name=table)
@@ -0,0 +1,247 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 10:35:57.638209
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUP_TABLES = ('SalesDaily', 'ProductSalesDaily', 'ClientSalesDaily', 'CategorySalesDaily')
+
+
+def upgrade() -> None:
+    # Las bases existentes se crearon con Base.metadata.create_all: solo se crean las tablas faltantes.
+    # Sin conexión (--sql) no se puede inspeccionar la base y se generan todas.
+    offline = context.is_offline_mode()
+    inspector = None if offline else sa.inspect(op.get_bind())
+
+    def missing(table):
+        return offline or not inspector.has_table(table)
+
+    rollups_missing = any(missing(table) for table in ROLLUP_TABLES)
+    has_sales = not missing('Tickets')
+
+    if missing('Categories'):
+        op.create_table('Categories',
+            sa.Column('ID_Category', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=True),
+            sa.Column('img_url', sa.String(length=500), nullable=True),
+            sa.PrimaryKeyConstraint('ID_Category')
+        )
+        op.create_index(op.f('ix_Categories_ID_Category'), 'Categories', ['ID_Category'], unique=False)
+
+    if missing('Clients'):
+        op.create_table('Clients',
+            sa.Column('ID_client', sa.Integer(), nullable=False),
+            sa.Column('Name', sa.String(length=255), nullable=True),
+            sa.Column('Address', sa.String(length=255), nullable=True),
+            sa.Column('Contact_info', sa.String(length=255), nullable=True),
+            sa.PrimaryKeyConstraint('ID_client')
+        )
+        op.create_index(op.f('ix_Clients_ID_client'), 'Clients', ['ID_client'], unique=False)
+
+    if missing('PromotionalCodes'):
+        op.create_table('PromotionalCodes',
+            sa.Column('ID_Code', sa.Integer(), nullable=False),
+            sa.Column('Code', sa.String(length=50), nullable=False),
+            sa.Column('Discount', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.Column('ExpirationDate', sa.Date(), nullable=True),
+            sa.Column('IsActive', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('ID_Code')
+        )
+        op.create_index(op.f('ix_PromotionalCodes_ID_Code'), 'PromotionalCodes', ['ID_Code'], unique=False)
+
+    if missing('Providers'):
+        op.create_table('Providers',
+            sa.Column('ID_provider', sa.Integer(), nullable=False),
+            sa.Column('Name', sa.String(length=255), nullable=True),
+            sa.PrimaryKeyConstraint('ID_provider')
+        )
+        op.create_index(op.f('ix_Providers_ID_provider'), 'Providers', ['ID_provider'], unique=False)
+
+    if missing('SalesDaily'):
+        op.create_table('SalesDaily',
+            sa.Column('Day', sa.Date(), nullable=False),
+            sa.Column('Tickets', sa.Integer(), nullable=False),
+            sa.Column('Total', sa.Numeric(precision=14, scale=2), nullable=False),
+            sa.PrimaryKeyConstraint('Day')
+        )
+
+    if missing('Users'):
+        op.create_table('Users',
+            sa.Column('ID_user', sa.Integer(), nullable=False),
+            sa.Column('Username', sa.String(length=255), nullable=True),
+            sa.Column('Password', sa.String(length=255), nullable=True),
+            sa.Column('User_type', sa.String(length=50), nullable=True),
+            sa.Column('UpdatedAt', sa.DateTime(), nullable=True),
+            sa.Column('CreatedAt', sa.DateTime(), nullable=False),
+            sa.Column('Phone', sa.String(length=50), nullable=True),
+            sa.PrimaryKeyConstraint('ID_user')
+        )
+        op.create_index(op.f('ix_Users_ID_user'), 'Users', ['ID_user'], unique=False)
+
+    if missing('CategorySalesDaily'):
+        op.create_table('CategorySalesDaily',
+            sa.Column('Day', sa.Date(), nullable=False),
+            sa.Column('ID_Category', sa.Integer(), nullable=False),
+            sa.Column('Lines', sa.Integer(), nullable=False),
+            sa.Column('Units', sa.Integer(), nullable=False),
+            sa.Column('Revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+            sa.ForeignKeyConstraint(['ID_Category'], ['Categories.ID_Category'], ),
+            sa.PrimaryKeyConstraint('Day', 'ID_Category')
+        )
+
+    if missing('ClientSalesDaily'):
+        op.create_table('ClientSalesDaily',
+            sa.Column('Day', sa.Date(), nullable=False),
+            sa.Column('ID_client', sa.Integer(), nullable=False),
+            sa.Column('Tickets', sa.Integer(), nullable=False),
+            sa.Column('Total', sa.Numeric(precision=14, scale=2), nullable=False),
+            sa.ForeignKeyConstraint(['ID_client'], ['Clients.ID_client'], ),
+            sa.PrimaryKeyConstraint('Day', 'ID_client')
+        )
+
+    if missing('Products'):
+        op.create_table('Products',
+            sa.Column('ID_product', sa.Integer(), nullable=False),
+            sa.Column('Product_name', sa.String(length=255), nullable=True),
+            sa.Column('Quantity', sa.Integer(), nullable=True),
+            sa.Column('Color', sa.String(length=255), nullable=True),
+            sa.Column('SKU', sa.String(length=255), nullable=True),
+            sa.Column('ID_provider', sa.Integer(), nullable=True),
+            sa.Column('Price_Sell', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.Column('Price_Buy', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.Column('Image_URL', sa.String(length=255), nullable=True),
+            sa.Column('Image_URL2', sa.String(length=255), nullable=True),
+            sa.Column('Image_URL3', sa.String(length=255), nullable=True),
+            sa.ForeignKeyConstraint(['ID_provider'], ['Providers.ID_provider'], ),
+            sa.PrimaryKeyConstraint('ID_product')
+        )
+        op.create_index(op.f('ix_Products_ID_product'), 'Products', ['ID_product'], unique=False)
+
+    if missing('Tickets'):
+        op.create_table('Tickets',
+            sa.Column('ID_ticket', sa.Integer(), nullable=False),
+            sa.Column('ID_client', sa.Integer(), nullable=True),
+            sa.Column('ID_user', sa.Integer(), nullable=True),
+            sa.Column('Issue_details', sa.String(length=1000), nullable=True),
+            sa.Column('Created_at', sa.DateTime(), nullable=True),
+            sa.Column('Updated_at', sa.DateTime(), nullable=True),
+            sa.Column('ID_Code', sa.Integer(), nullable=True),
+            sa.Column('ID_Cart', sa.Integer(), nullable=True),
+            sa.Column('Final_Price', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.Column('Prev_Price', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.ForeignKeyConstraint(['ID_Code'], ['PromotionalCodes.ID_Code'], ),
+            sa.ForeignKeyConstraint(['ID_client'], ['Clients.ID_client'], ),
+            sa.ForeignKeyConstraint(['ID_user'], ['Users.ID_user'], ),
+            sa.PrimaryKeyConstraint('ID_ticket')
+        )
+        op.create_index(op.f('ix_Tickets_ID_ticket'), 'Tickets', ['ID_ticket'], unique=False)
+
+    if missing('CartTransactions'):
+        op.create_table('CartTransactions',
+            sa.Column('ID_Transaction', sa.Integer(), nullable=False),
+            sa.Column('ID_User', sa.Integer(), nullable=True),
+            sa.Column('ID_Product', sa.Integer(), nullable=True),
+            sa.Column('Quantity', sa.Integer(), nullable=True),
+            sa.Column('Total_amount', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.Column('Payment_method', sa.String(length=100), nullable=True),
+            sa.Column('Order_date', sa.Date(), nullable=True),
+            sa.Column('Order_status', sa.String(length=50), nullable=True),
+            sa.Column('ID_Ticket', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['ID_Product'], ['Products.ID_product'], ),
+            sa.ForeignKeyConstraint(['ID_User'], ['Users.ID_user'], ),
+            sa.PrimaryKeyConstraint('ID_Transaction')
+        )
+        op.create_index(op.f('ix_CartTransactions_ID_Transaction'), 'CartTransactions', ['ID_Transaction'], unique=False)
+
+    if missing('Notifications'):
+        op.create_table('Notifications',
+            sa.Column('ID_Notification', sa.Integer(), nullable=False),
+            sa.Column('ID_Product', sa.Integer(), nullable=True),
+            sa.Column('Min_Stock', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['ID_Product'], ['Products.ID_product'], ),
+            sa.PrimaryKeyConstraint('ID_Notification')
+        )
+        op.create_index(op.f('ix_Notifications_ID_Notification'), 'Notifications', ['ID_Notification'], unique=False)
+
+    if missing('ProductCategories'):
+        op.create_table('ProductCategories',
+            sa.Column('ID_Product', sa.Integer(), nullable=False),
+            sa.Column('ID_Category', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['ID_Category'], ['Categories.ID_Category'], ),
+            sa.ForeignKeyConstraint(['ID_Product'], ['Products.ID_product'], ),
+            sa.PrimaryKeyConstraint('ID_Product', 'ID_Category')
+        )
+
+    if missing('ProductSalesDaily'):
+        op.create_table('ProductSalesDaily',
+            sa.Column('Day', sa.Date(), nullable=False),
+            sa.Column('ID_Product', sa.Integer(), nullable=False),
+            sa.Column('Lines', sa.Integer(), nullable=False),
+            sa.Column('Units', sa.Integer(), nullable=False),
+            sa.Column('Revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+            sa.ForeignKeyConstraint(['ID_Product'], ['Products.ID_product'], ),
+            sa.PrimaryKeyConstraint('Day', 'ID_Product')
+        )
+
+    # En una base con ventas las tablas de resumen se crean vacías: se llenan con el historial para que
+    # el dashboard no muestre totales en cero (equivale a `python rollups.py`; no aplica con --sql)
+    if rollups_missing and has_sales:
+        from sqlalchemy.orm import Session
+
+        import rollups
+
+        session = Session(bind=op.get_bind())
+        rollups.rebuild(session)
+        session.flush()
+
+
+def downgrade() -> None:
+    op.drop_table('ProductSalesDaily')
+
+    op.drop_table('ProductCategories')
+
+    op.drop_index(op.f('ix_Notifications_ID_Notification'), table_name='Notifications')
+    op.drop_table('Notifications')
+
+    op.drop_index(op.f('ix_CartTransactions_ID_Transaction'), table_name='CartTransactions')
+    op.drop_table('CartTransactions')
+
+    op.drop_index(op.f('ix_Tickets_ID_ticket'), table_name='Tickets')
+    op.drop_table('Tickets')
+
+    op.drop_index(op.f('ix_Products_ID_product'), table_name='Products')
+    op.drop_table('Products')
+
+    op.drop_table('ClientSalesDaily')
+
+    op.drop_table('CategorySalesDaily')
+
+    op.drop_index(op.f('ix_Users_ID_user'), table_name='Users')
+    op.drop_table('Users')
+
+    op.drop_table('SalesDaily')
+
+    op.drop_index(op.f('ix_Providers_ID_provider'), table_name='Providers')
+    op.drop_table('Providers')
+
+    op.drop_index(op.f('ix_PromotionalCodes_ID_Code'), table_name='PromotionalCodes')
+    op.drop_table('PromotionalCodes')
+
+    op.drop_index(op.f('ix_Clients_ID_client'), table_name='Clients')
+    op.drop_table('Clients')
+
+    op.drop_index(op.f('ix_Categories_ID_Category'), table_name='Categories')
+    op.drop_table('Categories')
@@ -0,0 +1,59 @@
+"""hot lookup indexes
+
+Índices para las consultas más frecuentes: login/registro por Username, carrito pendiente
+por usuario y estado, detalle de ticket, reportes por fecha y búsqueda por SKU. En SQL Server
+se crean con ONLINE = ON (en las ediciones que lo permiten) para no bloquear las tablas existentes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:36:25.667960
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from migrations.online import create_index_online, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# El registro anterior verificaba y luego insertaba, así que puede haber usuarios repetidos.
+# No se combinan automáticamente (tienen tickets y transacciones propios): se detiene la migración.
+def check_duplicate_usernames():
+    if context.is_offline_mode():
+        return
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT "Username", COUNT(*) FROM "Users" WHERE "Username" IS NOT NULL '
+        'GROUP BY "Username" HAVING COUNT(*) > 1'
+    )).all()
+    if duplicates:
+        listed = ", ".join(f"{username!r} ({count})" for username, count in duplicates[:20])
+        raise RuntimeError(
+            f"Cannot create UX_Users_Username: {len(duplicates)} usernames are repeated in Users: {listed}. "
+            "Rename or merge those users and run the migration again."
+        )
+
+
+def upgrade() -> None:
+    check_duplicate_usernames()
+    create_index_online('UX_Users_Username', 'Users', ['Username'], unique=True, where='"Username" IS NOT NULL')
+    create_index_online('IX_CartTransactions_User_Status', 'CartTransactions', ['ID_User', 'Order_status'],
+                        include=['Total_amount'])
+    create_index_online('IX_CartTransactions_Ticket', 'CartTransactions', ['ID_Ticket'])
+    create_index_online('IX_Tickets_Created_at', 'Tickets', ['Created_at'])
+    create_index_online('IX_Products_SKU', 'Products', ['SKU'])
+
+
+def downgrade() -> None:
+    drop_index('IX_Products_SKU', 'Products')
+    drop_index('IX_Tickets_Created_at', 'Tickets')
+    drop_index('IX_CartTransactions_Ticket', 'CartTransactions')
+    drop_index('IX_CartTransactions_User_Status', 'CartTransactions')
+    drop_index('UX_Users_Username', 'Users')
@@ -0,0 +1,28 @@
+"""notification stock index
+
+Índice para evaluar las reglas de stock mínimo de los productos vendidos sin recorrer
+toda la tabla Notifications.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:42:10.118305
+
+"""
+from typing import Sequence, Union
+
+from migrations.online import create_index_online, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index_online('IX_Notifications_Product_MinStock', 'Notifications', ['ID_Product', 'Min_Stock'])
+
+
+def downgrade() -> None:
+    drop_index('IX_Notifications_Product_MinStock', 'Notifications')
@@ -0,0 +1,28 @@
+"""cart order date index
+
+Índice por fecha de orden para exportar las transacciones de un rango de fechas sin recorrer
+toda la tabla CartTransactions.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:44:25.824538
+
+"""
+from typing import Sequence, Union
+
+from migrations.online import create_index_online, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index_online('IX_CartTransactions_Order_date', 'CartTransactions', ['Order_date'])
+
+
+def downgrade() -> None:
+    drop_index('IX_CartTransactions_Order_date', 'CartTransactions')
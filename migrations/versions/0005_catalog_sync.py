@@ -0,0 +1,74 @@
+"""catalog sync
+
+Seguimiento de cambios para la sincronización de las cajas: columnas UpdatedAt/SyncVersion en
+el catálogo (Products, Categories, ProductCategories, PromotionalCodes), el contador global de
+versiones, el registro de filas eliminadas y la referencia de la caja en Tickets para no
+duplicar ventas sin conexión reenviadas.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 10:52:13.402871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.online import create_index_online, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNC_TABLES = ('Categories', 'Products', 'ProductCategories', 'PromotionalCodes')
+
+
+def upgrade() -> None:
+    for table in SYNC_TABLES:
+        op.add_column(table, sa.Column('UpdatedAt', sa.DateTime(), nullable=True))
+        op.add_column(table, sa.Column('SyncVersion', sa.BigInteger(), nullable=False, server_default='0'))
+        create_index_online(f'IX_{table}_SyncVersion', table, ['SyncVersion'])
+
+    op.create_table('SyncCounters',
+        sa.Column('Name', sa.String(length=50), nullable=False),
+        sa.Column('Value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('Name')
+    )
+    # INSERT simple: con --sql, bulk_insert en SQL Server agrega SET IDENTITY_INSERT
+    counters = sa.table('SyncCounters', sa.column('Name', sa.String), sa.column('Value', sa.BigInteger))
+    op.execute(counters.insert().values(Name='catalog', Value=0))
+
+    op.create_table('SyncTombstones',
+        sa.Column('ID_Tombstone', sa.Integer(), nullable=False),
+        sa.Column('Table_name', sa.String(length=50), nullable=False),
+        sa.Column('Row_key', sa.String(length=100), nullable=False),
+        sa.Column('SyncVersion', sa.BigInteger(), nullable=False),
+        sa.Column('Deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('ID_Tombstone')
+    )
+    op.create_index('IX_SyncTombstones_SyncVersion', 'SyncTombstones', ['SyncVersion'])
+
+    op.add_column('Tickets', sa.Column('Client_ref', sa.String(length=64), nullable=True))
+    create_index_online('UX_Tickets_Client_ref', 'Tickets', ['Client_ref'], unique=True,
+                        where='"Client_ref" IS NOT NULL')
+
+
+def downgrade() -> None:
+    drop_index('UX_Tickets_Client_ref', 'Tickets')
+    with op.batch_alter_table('Tickets') as batch:
+        batch.drop_column('Client_ref')
+
+    drop_index('IX_SyncTombstones_SyncVersion', 'SyncTombstones')
+    op.drop_table('SyncTombstones')
+    op.drop_table('SyncCounters')
+
+    for table in reversed(SYNC_TABLES):
+        drop_index(f'IX_{table}_SyncVersion', table)
+        with op.batch_alter_table(table) as batch:
+            # En SQL Server primero se elimina la restricción DEFAULT creada por server_default
+            batch.drop_column('SyncVersion', mssql_drop_default=True)
+            batch.drop_column('UpdatedAt')
@@ -1,13 +1,19 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Boolean, ForeignKey, func
+from sqlalchemy import Column, Integer, BigInteger, String, Numeric, Date, DateTime, Boolean, ForeignKey, Index, func, \
+    text
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Category(Base):
     __tablename__ = "Categories"
+    __table_args__ = (
+        Index("IX_Categories_SyncVersion", "SyncVersion"),
+    )
 
     ID_Category = Column(Integer, primary_key=True, index=True)
     name = Column(String(255))
     img_url = Column(String(500))
+    UpdatedAt = Column(DateTime)
+    SyncVersion = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     # Relaciones
     products = relationship("ProductCategory", back_populates="category")
@@ -27,6 +33,10 @@ class Client(Base):
 
 class Product(Base):
     __tablename__ = "Products"
+    __table_args__ = (
+        Index("IX_Products_SKU", "SKU"),
+        Index("IX_Products_SyncVersion", "SyncVersion"),
+    )
 
     ID_product = Column(Integer, primary_key=True, index=True)
     Product_name = Column(String(255))
@@ -39,6 +49,8 @@ class Product(Base):
     Image_URL = Column(String(255))
     Image_URL2 = Column(String(255))
     Image_URL3 = Column(String(255))
+    UpdatedAt = Column(DateTime)
+    SyncVersion = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     # Relaciones
     provider = relationship("Provider", back_populates="products")
@@ -49,6 +61,9 @@ class Product(Base):
 
 class Notification(Base):
     __tablename__ = "Notifications"
+    __table_args__ = (
+        Index("IX_Notifications_Product_MinStock", "ID_Product", "Min_Stock"),
+    )
 
     ID_Notification = Column(Integer, primary_key=True, index=True)
     ID_Product = Column(Integer, ForeignKey("Products.ID_product"))
@@ -60,9 +75,14 @@ class Notification(Base):
 
 class ProductCategory(Base):
     __tablename__ = "ProductCategories"
+    __table_args__ = (
+        Index("IX_ProductCategories_SyncVersion", "SyncVersion"),
+    )
 
     ID_Product = Column(Integer, ForeignKey("Products.ID_product"), primary_key=True)
     ID_Category = Column(Integer, ForeignKey("Categories.ID_Category"), primary_key=True)
+    UpdatedAt = Column(DateTime)
+    SyncVersion = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     # Relaciones
     product = relationship("Product", back_populates="categories")
@@ -71,12 +91,17 @@ class ProductCategory(Base):
 
 class PromotionalCode(Base):
     __tablename__ = "PromotionalCodes"
+    __table_args__ = (
+        Index("IX_PromotionalCodes_SyncVersion", "SyncVersion"),
+    )
 
     ID_Code = Column(Integer, primary_key=True, index=True)
     Code = Column(String(50), nullable=False)
     Discount = Column(Numeric(10, 2))
     ExpirationDate = Column(Date)
     IsActive = Column(Boolean, default=True)
+    UpdatedAt = Column(DateTime)
+    SyncVersion = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     # Relaciones
     tickets = relationship("Ticket", back_populates="promotional_code")
@@ -94,6 +119,12 @@ class Provider(Base):
 
 class User(Base):
     __tablename__ = "Users"
+    __table_args__ = (
+        # Único solo entre los que tienen Username (SQL Server admite un solo NULL en un índice único)
+        Index("UX_Users_Username", "Username", unique=True,
+              mssql_where=text("Username IS NOT NULL"), sqlite_where=text("Username IS NOT NULL"),
+              postgresql_where=text('"Username" IS NOT NULL')),
+    )
 
     ID_user = Column(Integer, primary_key=True, index=True)
     Username = Column(String(255))
@@ -110,6 +141,11 @@ class User(Base):
 
 class CartTransaction(Base):
     __tablename__ = "CartTransactions"
+    __table_args__ = (
+        Index("IX_CartTransactions_User_Status", "ID_User", "Order_status", mssql_include=["Total_amount"]),
+        Index("IX_CartTransactions_Ticket", "ID_Ticket"),
+        Index("IX_CartTransactions_Order_date", "Order_date"),
+    )
 
     ID_Transaction = Column(Integer, primary_key=True, index=True)
     ID_User = Column(Integer, ForeignKey("Users.ID_user"))
@@ -128,6 +164,13 @@ class CartTransaction(Base):
 
 class Ticket(Base):
     __tablename__ = "Tickets"
+    __table_args__ = (
+        Index("IX_Tickets_Created_at", "Created_at"),
+        # Referencia de la venta en la caja (ventas sin conexión); única cuando existe
+        Index("UX_Tickets_Client_ref", "Client_ref", unique=True,
+              mssql_where=text("Client_ref IS NOT NULL"), sqlite_where=text("Client_ref IS NOT NULL"),
+              postgresql_where=text('"Client_ref" IS NOT NULL')),
+    )
 
     ID_ticket = Column(Integer, primary_key=True, index=True)
     ID_client = Column(Integer, ForeignKey("Clients.ID_client"))
@@ -139,8 +182,72 @@ class Ticket(Base):
     ID_Cart = Column(Integer)
     Final_Price = Column(Numeric(10, 2))
     Prev_Price = Column(Numeric(10, 2))
+    Client_ref = Column(String(64))
 
     # Relaciones
     client = relationship("Client", back_populates="tickets")
     user = relationship("User", back_populates="tickets")
-    promotional_code = relationship("PromotionalCode", back_populates="tickets")
\ No newline at end of file
+    promotional_code = relationship("PromotionalCode", back_populates="tickets")
+    cart_transactions = relationship(
+        "CartTransaction",
+        primaryjoin="Ticket.ID_ticket == foreign(CartTransaction.ID_Ticket)",
+        viewonly=True
+    )
+
+# Tablas de resumen diario (se mantienen al crear tickets y completar carritos)
+class SalesDaily(Base):
+    __tablename__ = "SalesDaily"
+
+    Day = Column(Date, primary_key=True)
+    Tickets = Column(Integer, nullable=False, default=0)
+    Total = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+class ProductSalesDaily(Base):
+    __tablename__ = "ProductSalesDaily"
+
+    Day = Column(Date, primary_key=True)
+    ID_Product = Column(Integer, ForeignKey("Products.ID_product"), primary_key=True)
+    Lines = Column(Integer, nullable=False, default=0)
+    Units = Column(Integer, nullable=False, default=0)
+    Revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+class ClientSalesDaily(Base):
+    __tablename__ = "ClientSalesDaily"
+
+    Day = Column(Date, primary_key=True)
+    ID_client = Column(Integer, ForeignKey("Clients.ID_client"), primary_key=True)
+    Tickets = Column(Integer, nullable=False, default=0)
+    Total = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+class CategorySalesDaily(Base):
+    __tablename__ = "CategorySalesDaily"
+
+    Day = Column(Date, primary_key=True)
+    ID_Category = Column(Integer, ForeignKey("Categories.ID_Category"), primary_key=True)
+    Lines = Column(Integer, nullable=False, default=0)
+    Units = Column(Integer, nullable=False, default=0)
+    Revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+# Sincronización de las cajas: contador global de versiones y registro de filas eliminadas
+class SyncCounter(Base):
+    __tablename__ = "SyncCounters"
+
+    Name = Column(String(50), primary_key=True)
+    Value = Column(BigInteger, nullable=False, default=0)
+
+
+class SyncTombstone(Base):
+    __tablename__ = "SyncTombstones"
+    __table_args__ = (
+        Index("IX_SyncTombstones_SyncVersion", "SyncVersion"),
+    )
+
+    ID_Tombstone = Column(Integer, primary_key=True)
+    Table_name = Column(String(50), nullable=False)
+    Row_key = Column(String(100), nullable=False)
+    SyncVersion = Column(BigInteger, nullable=False)
+    Deleted_at = Column(DateTime, nullable=False)
@@ -0,0 +1,88 @@
+import functools
+from decimal import Decimal
+from typing import List
+
+import orjson
+from fastapi import HTTPException, Response, status
+from pydantic import TypeAdapter
+
+# Tamaño máximo de página permitido en los listados
+MAX_PAGE_SIZE = 1000
+
+
+# Columnas solicitadas con `fields=` (separadas por coma), limitadas a las del esquema de respuesta
+def projection(model, fields, schema):
+    if not fields:
+        return None
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    allowed = set(schema.model_fields) & set(model.__table__.columns.keys())
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {unknown}"
+        )
+
+    # La llave primaria siempre se incluye porque es el cursor de la página
+    key = next(iter(model.__table__.primary_key.columns)).key
+    return [getattr(model, name) for name in dict.fromkeys([key, *names])]
+
+
+# Columnas del modelo que forman el esquema de respuesta completo (sin cargar objetos del ORM)
+def schema_columns(model, schema):
+    names = model.__table__.columns.keys()
+    return [getattr(model, name) for name in schema.model_fields if name in names]
+
+
+# Aplicar la proyección y la paginación por clave (keyset) sobre la llave primaria
+def keyset(stmt, key, after=None, limit=None, columns=None):
+    if columns:
+        stmt = stmt.with_only_columns(*columns)
+    if after is not None:
+        stmt = stmt.where(key > after)
+    stmt = stmt.order_by(key)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+# Filas de un resultado (tuplas de columnas) como diccionarios
+def as_dicts(result):
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+# Serializador precompilado de una lista del esquema: valida y genera el JSON en pydantic-core
+@functools.lru_cache(maxsize=None)
+def list_adapter(schema):
+    return TypeAdapter(List[schema])
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+# JSON de la página y encabezado `X-Next-Cursor` con el siguiente cursor.
+# Las proyecciones (`fields=`) no tienen todos los campos del esquema y se codifican con orjson.
+def render_page(rows, key, limit, schema, projected=False):
+    headers = {}
+    if limit and len(rows) == limit:
+        headers["X-Next-Cursor"] = str(rows[-1][key.key])
+
+    if projected:
+        return orjson.dumps(rows, default=_default), headers
+
+    adapter = list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(rows)), headers
+
+
+# Respuesta con el JSON ya generado (FastAPI no vuelve a validar ni a codificar el response_model)
+def respond(body, headers, response: Response):
+    return Response(body, media_type="application/json", headers={**response.headers, **headers})
+
+
+def page(rows, key, limit, response: Response, schema, projected=False):
+    return respond(*render_page(rows, key, limit, schema, projected), response)
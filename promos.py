@@ -0,0 +1,150 @@
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from config import PROMO_CODES_TTL
+from database import SessionLocal
+from models import PromotionalCode
+
+FIELDS = ("ID_Code", "Code", "Discount", "ExpirationDate", "IsActive")
+
+
+class PromoExpired(Exception):
+    def __init__(self, code):
+        super().__init__(f"Promotional code {code} has expired")
+        self.code = code
+
+
+# Los códigos se escriben a mano en la caja: sin espacios y sin distinguir mayúsculas
+def normalize(code):
+    return (code or "").strip().upper()
+
+
+def _data(promo):
+    data = {field: getattr(promo, field) for field in FIELDS}
+    if isinstance(data["ExpirationDate"], datetime):
+        data["ExpirationDate"] = data["ExpirationDate"].date()
+    return data
+
+
+def expired(data, on: date):
+    return data["ExpirationDate"] is not None and data["ExpirationDate"] < on
+
+
+# Códigos promocionales en memoria por ID y por código
+class PromoCodes:
+    def __init__(self):
+        self._by_id = {}
+        self._by_code = {}
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        # Próxima fecha de vencimiento de un código activo: al pasar ese día se recarga el mapa
+        self.boundary = None
+
+    def rebuild(self, promos):
+        by_id, by_code = {}, {}
+        for data in promos:
+            by_id[data["ID_Code"]] = data
+            self._index_code(by_code, data)
+
+        with self._lock:
+            self._by_id, self._by_code = by_id, by_code
+            self.boundary = self._next_boundary(by_id.values())
+            self.loaded_at = time.monotonic()
+
+    def put(self, data):
+        with self._lock:
+            by_code = dict(self._by_code)
+            self._index_code(by_code, data)
+            self._by_id = {**self._by_id, data["ID_Code"]: data}
+            self._by_code = by_code
+            self.boundary = self._next_boundary(self._by_id.values())
+
+    # Si un código está repetido gana el activo y, entre iguales, el más reciente
+    @staticmethod
+    def _index_code(by_code, data):
+        code = normalize(data["Code"])
+        current = by_code.get(code)
+        if current is None or (data["IsActive"], data["ID_Code"]) > (current["IsActive"], current["ID_Code"]):
+            by_code[code] = data
+
+    @staticmethod
+    def _next_boundary(promos):
+        today = date.today()
+        dates = [data["ExpirationDate"] for data in promos
+                 if data["IsActive"] and data["ExpirationDate"] and data["ExpirationDate"] >= today]
+        return min(dates, default=None)
+
+    def get(self, id_code):
+        return self._by_id.get(id_code)
+
+    def find(self, code):
+        return self._by_code.get(normalize(code))
+
+
+promo_codes = PromoCodes()
+_load_lock = threading.Lock()
+
+
+# Se recarga al primer uso, cada PROMO_CODES_TTL segundos (cambios de otros workers)
+# y cuando vence algún código activo
+def stale():
+    if promo_codes.loaded_at is None or time.monotonic() - promo_codes.loaded_at > PROMO_CODES_TTL:
+        return True
+    return promo_codes.boundary is not None and date.today() > promo_codes.boundary
+
+
+def load(session: Session):
+    promo_codes.rebuild([_data(promo) for promo in session.scalars(select(PromotionalCode))])
+
+
+# Recargar si está vencido (pensado para correr en un hilo con asyncio.to_thread).
+# Solo la primera carga espera; mientras otra petición recarga se usan los datos actuales.
+def refresh():
+    if not stale() or not _load_lock.acquire(blocking=promo_codes.loaded_at is None):
+        return
+    try:
+        if stale():
+            with SessionLocal() as session:
+                load(session)
+    finally:
+        _load_lock.release()
+
+
+# Registrar un código recién creado o modificado
+def index_promo(promo):
+    data = _data(promo)
+    promo_codes.put(data)
+    return data
+
+
+# Un código que no está en memoria puede haberse creado en otro worker desde la última carga:
+# se busca en la base de datos y se agrega al mapa
+def fetch_id(session: Session, id_code):
+    promo = session.get(PromotionalCode, id_code)
+    return index_promo(promo) if promo else None
+
+
+def fetch_code(session: Session, code):
+    promo = session.scalars(
+        select(PromotionalCode)
+        .where(func.upper(func.ltrim(func.rtrim(PromotionalCode.Code))) == normalize(code))
+        .order_by(PromotionalCode.IsActive.desc(), PromotionalCode.ID_Code.desc())
+        .limit(1)
+    ).first()
+    return index_promo(promo) if promo else None
+
+
+# Precio final con el descuento del código (vigente hasta su fecha de vencimiento inclusive).
+# Un código inexistente o inactivo no cambia el precio; uno vencido lanza PromoExpired.
+def apply(data, pre_price, on: date = None):
+    if not data or not data["IsActive"]:
+        return pre_price
+    if expired(data, on or date.today()):
+        raise PromoExpired(data["Code"])
+
+    discount = data["Discount"] or 0
+    return pre_price - (pre_price * (discount / 100))
@@ -0,0 +1,177 @@
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, time
+
+from sqlalchemy import Date, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+
+from models import Ticket, CartTransaction, ProductCategory, SalesDaily, ProductSalesDaily, ClientSalesDaily, \
+    CategorySalesDaily
+
+
+# Día (fecha sin hora) de una columna DateTime, portable entre SQL Server y SQLite
+class day(FunctionElement):
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(day)
+def _day_default(element, compiler, **kw):
+    return "CAST(%s AS DATE)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day, "sqlite")
+def _day_sqlite(element, compiler, **kw):
+    return "date(%s)" % compiler.process(element.clauses, **kw)
+
+
+def _as_day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+# Sumar cantidades a una fila de resumen; si no existe se inserta
+def _increment(session: Session, model, key: dict, amounts: dict):
+    stmt = update(model).where(
+        *[getattr(model, name) == value for name, value in key.items()]
+    ).values(
+        {name: getattr(model, name) + amount for name, amount in amounts.items()}
+    ).execution_options(synchronize_session=False)
+
+    if session.execute(stmt).rowcount:
+        return
+
+    try:
+        with session.begin_nested():
+            session.execute(insert(model).values(**key, **amounts))
+    except IntegrityError:
+        # Otra transacción insertó la fila al mismo tiempo
+        session.execute(stmt)
+
+
+# Registrar un ticket nuevo en las ventas diarias y en las del cliente
+def record_ticket(session: Session, ticket: Ticket):
+    record_tickets(session, [ticket])
+
+
+# Registrar varios tickets (filas con Created_at, Final_Price, ID_client) con un incremento por día y cliente
+def record_tickets(session: Session, tickets):
+    days = defaultdict(lambda: [0, 0])
+    clients = defaultdict(lambda: [0, 0])
+    for ticket in tickets:
+        ticket_day = _as_day(ticket.Created_at)
+        total = ticket.Final_Price or 0
+        days[ticket_day][0] += 1
+        days[ticket_day][1] += total
+        if ticket.ID_client is not None:
+            clients[(ticket_day, ticket.ID_client)][0] += 1
+            clients[(ticket_day, ticket.ID_client)][1] += total
+
+    for ticket_day, (count, total) in days.items():
+        _increment(session, SalesDaily, {"Day": ticket_day}, {"Tickets": count, "Total": total})
+    for (ticket_day, client_id), (count, total) in clients.items():
+        _increment(
+            session, ClientSalesDaily, {"Day": ticket_day, "ID_client": client_id},
+            {"Tickets": count, "Total": total}
+        )
+
+
+# Registrar líneas de carrito completadas (filas con ID_Product, Quantity, Total_amount, Order_date)
+def record_cart_lines(session: Session, rows):
+    totals = defaultdict(lambda: [0, 0, 0])
+    for row in rows:
+        entry = totals[(_as_day(row.Order_date), row.ID_Product)]
+        entry[0] += 1
+        entry[1] += row.Quantity or 0
+        entry[2] += row.Total_amount or 0
+
+    for (line_day, product_id), (lines, units, revenue) in totals.items():
+        _increment(
+            session, ProductSalesDaily, {"Day": line_day, "ID_Product": product_id},
+            {"Lines": lines, "Units": units, "Revenue": revenue}
+        )
+
+    # Las ventas se atribuyen a las categorías que tiene el producto al momento de la venta
+    categories = defaultdict(list)
+    product_ids = {product_id for _, product_id in totals}
+    for product_id, category_id in session.execute(
+        select(ProductCategory.ID_Product, ProductCategory.ID_Category)
+        .where(ProductCategory.ID_Product.in_(product_ids))
+    ):
+        categories[product_id].append(category_id)
+
+    category_totals = defaultdict(lambda: [0, 0, 0])
+    for (line_day, product_id), amounts in totals.items():
+        for category_id in categories[product_id]:
+            entry = category_totals[(line_day, category_id)]
+            for i, amount in enumerate(amounts):
+                entry[i] += amount
+
+    for (line_day, category_id), (lines, units, revenue) in category_totals.items():
+        _increment(
+            session, CategorySalesDaily, {"Day": line_day, "ID_Category": category_id},
+            {"Lines": lines, "Units": units, "Revenue": revenue}
+        )
+
+
+# Reconstruir los resúmenes (completos o de un rango de días) a partir de Tickets y CartTransactions
+def rebuild(session: Session, date_from: date = None, date_to: date = None):
+    def in_range(column, as_datetime=False):
+        conditions = []
+        if date_from:
+            conditions.append(column >= (datetime.combine(date_from, time.min) if as_datetime else date_from))
+        if date_to:
+            conditions.append(column < (datetime.combine(date_to, time.min) if as_datetime else date_to))
+        return conditions
+
+    for model in (SalesDaily, ProductSalesDaily, ClientSalesDaily, CategorySalesDaily):
+        session.execute(delete(model).where(*in_range(model.Day)))
+
+    ticket_day = day(Ticket.Created_at)
+    session.execute(insert(SalesDaily).from_select(
+        ["Day", "Tickets", "Total"],
+        select(ticket_day, func.count(Ticket.ID_ticket), func.coalesce(func.sum(Ticket.Final_Price), 0))
+        .where(Ticket.Created_at.is_not(None), *in_range(Ticket.Created_at, as_datetime=True))
+        .group_by(ticket_day)
+    ))
+    session.execute(insert(ClientSalesDaily).from_select(
+        ["Day", "ID_client", "Tickets", "Total"],
+        select(ticket_day, Ticket.ID_client, func.count(Ticket.ID_ticket),
+               func.coalesce(func.sum(Ticket.Final_Price), 0))
+        .where(Ticket.Created_at.is_not(None), Ticket.ID_client.is_not(None),
+               *in_range(Ticket.Created_at, as_datetime=True))
+        .group_by(ticket_day, Ticket.ID_client)
+    ))
+    session.execute(insert(ProductSalesDaily).from_select(
+        ["Day", "ID_Product", "Lines", "Units", "Revenue"],
+        select(CartTransaction.Order_date, CartTransaction.ID_Product, func.count(CartTransaction.ID_Transaction),
+               func.coalesce(func.sum(CartTransaction.Quantity), 0),
+               func.coalesce(func.sum(CartTransaction.Total_amount), 0))
+        .where(CartTransaction.Order_status == "Completado", CartTransaction.Order_date.is_not(None),
+               CartTransaction.ID_Product.is_not(None), *in_range(CartTransaction.Order_date))
+        .group_by(CartTransaction.Order_date, CartTransaction.ID_Product)
+    ))
+    session.execute(insert(CategorySalesDaily).from_select(
+        ["Day", "ID_Category", "Lines", "Units", "Revenue"],
+        select(ProductSalesDaily.Day, ProductCategory.ID_Category, func.sum(ProductSalesDaily.Lines),
+               func.sum(ProductSalesDaily.Units), func.sum(ProductSalesDaily.Revenue))
+        .join(ProductCategory, ProductSalesDaily.ID_Product == ProductCategory.ID_Product)
+        .where(*in_range(ProductSalesDaily.Day))
+        .group_by(ProductSalesDaily.Day, ProductCategory.ID_Category)
+    ))
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Reconstruir las tablas de resumen de ventas")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="Primer día (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Día final, exclusivo (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        rebuild(db, args.date_from, args.date_to)
+        db.commit()
+    print("Rollups rebuilt")
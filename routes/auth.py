@@ -1,31 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from dependences import get_db
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from dependences import get_async_db
 from models import User
 from schemas import UserCreate, UserLogin, Token
-from security import create_access_token
-from passlib.context import CryptContext
+from security import create_access_token, hasher, user_version
 
 # Instancia de router
 router = APIRouter(tags=["Authentication"])
 
-# Instancia de CryptContext para hash de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 # Endpoint para registrar un nuevo usuario
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Verificar si el usuario ya existe
-    db_user = db.query(User).filter(User.Username == user.Username).first()
+    db_user = await db.scalar(select(User).where(User.Username == user.Username))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Username already exists"
         )
 
-    # Crear hash de la contraseña
-    hashed_password = pwd_context.hash(user.Password)
+    # Crear hash de la contraseña (en el servicio de hash dedicado)
+    hashed_password = await hasher.hash(user.Password)
 
     # Crear nuevo usuario
     new_user = User(
@@ -36,31 +34,59 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
     # Guardar usuario en la base de datos
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Otro registro con el mismo Username se confirmó al mismo tiempo (índice único)
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Username already exists"
+        )
 
     return {"msg": "User registered successfully"}
 
 
 # Endpoint para login
 @router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     # Verificar si el usuario existe
-    user = db.query(User).filter(User.Username == user_data.Username).first()
+    user = await db.scalar(select(User).where(User.Username == user_data.Username))
 
-    if not user or not pwd_context.verify(user_data.Password, user.Password):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await hasher.verify_and_update(user_data.Password, user.Password)
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Bad username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Rehash transparente si cambiaron los parámetros de bcrypt
+    if new_hash:
+        user.Password = new_hash
+        await db.commit()
+
     # Crear token JWT
-    access_token = create_access_token(data={"sub": user.Username})
+    # uid y ver permiten verificar el token sin consultar la base (ver get_current_user)
+    access_token = create_access_token(data={
+        "sub": user.Username,
+        "uid": user.ID_user,
+        "role": user.User_type,
+        "ver": user_version(user.UpdatedAt)
+    })
 
     return {
         "access_token": access_token,
         "Username": user.Username,
         "User_type": user.User_type,
         "ID_user": user.ID_user
-    }
\ No newline at end of file
+    }
+
+
+# Estadísticas del servicio de hash (cola y rechazos)
+@router.get("/hasher/stats")
+def get_hasher_stats():
+    return hasher.stats()
@@ -1,35 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, extract
 from typing import List
 
-from dependences import get_db
-from models import Ticket, CartTransaction, Product, Client
+from coalesce import Coalescer
+from config import DASHBOARD_FRESH, DASHBOARD_STALE
+from database import SessionLocal
+from dependences import date_range
+from models import Product, Client, Category, SalesDaily, ProductSalesDaily, ClientSalesDaily, CategorySalesDaily
+from versions import conditional, version
 
-from schemas import TotalSalesResponse, TopItemResponse, TopClientResponse
+from schemas import TotalSalesResponse, TopItemResponse, TopClientResponse, MonthlySalesResponse, \
+    CategoryStatsResponse
 
 # Instancia de router
 router = APIRouter(tags=["Dashboard"])
 
+# Resultados compartidos de los reportes: muchas pantallas consultando a la vez generan una sola consulta
+aggregates = Coalescer(DASHBOARD_FRESH, DASHBOARD_STALE)
+
+
+def _load(query, tables, *args):
+    # La versión se toma antes de consultar: si algo cambia durante la consulta el resultado queda marcado viejo
+    loaded_version = version(*tables)
+    with SessionLocal() as db:
+        return query(db, *args), loaded_version
+
+
+# Servir un reporte desde el coalescer. Si el resultado es anterior a la versión actual de sus tablas
+# se quita el ETag, para que el cliente no lo guarde como vigente.
+def aggregate(response: Response, tables, query, *args):
+    result, loaded_version = aggregates.get((query.__name__, *args), _load, query, tables, *args)
+    if loaded_version != version(*tables) and "etag" in response.headers:
+        del response.headers["etag"]
+    return result
+
 
 # Endpoint para obtener el total de ventas
-@router.get("/total_sales", response_model=TotalSalesResponse)
-def get_total_sales(db: Session = Depends(get_db)):
-    total_sales = db.query(func.sum(Ticket.Final_Price)).scalar() or 0
+@router.get("/total_sales", response_model=TotalSalesResponse, dependencies=[Depends(conditional("SalesDaily"))])
+def get_total_sales(response: Response):
+    return aggregate(response, ("SalesDaily",), total_sales)
+
+
+def total_sales(db: Session):
+    total_sales = db.query(func.sum(SalesDaily.Total)).scalar() or 0
     return {"Venta_Total": total_sales}
 
 
 # Endpoint para obtener los 10 productos más vendidos
-@router.get("/top_items", response_model=List[TopItemResponse])
-def get_top_items(db: Session = Depends(get_db)):
+@router.get("/top_items", response_model=List[TopItemResponse],
+            dependencies=[Depends(conditional("ProductSalesDaily", "Products"))])
+def get_top_items(response: Response):
+    return aggregate(response, ("ProductSalesDaily", "Products"), top_items)
+
+
+def top_items(db: Session):
     top_items = db.query(
-        CartTransaction.ID_Product,
+        ProductSalesDaily.ID_Product,
         Product.Product_name,
-        func.count(CartTransaction.ID_Product).label("count")
+        func.sum(ProductSalesDaily.Lines).label("count")
     ).join(
-        Product, CartTransaction.ID_Product == Product.ID_product
+        Product, ProductSalesDaily.ID_Product == Product.ID_product
     ).group_by(
-        CartTransaction.ID_Product, Product.Product_name
+        ProductSalesDaily.ID_Product, Product.Product_name
     ).order_by(
         desc("count")
     ).limit(10).all()
@@ -38,16 +71,21 @@ def get_top_items(db: Session = Depends(get_db)):
 
 
 # Endpoint para obtener los 10 clientes principales
-@router.get("/top_clients", response_model=List[TopClientResponse])
-def get_top_clients(db: Session = Depends(get_db)):
+@router.get("/top_clients", response_model=List[TopClientResponse],
+            dependencies=[Depends(conditional("ClientSalesDaily", "Clients"))])
+def get_top_clients(response: Response):
+    return aggregate(response, ("ClientSalesDaily", "Clients"), top_clients)
+
+
+def top_clients(db: Session):
     top_clients = db.query(
-        Ticket.ID_client,
+        ClientSalesDaily.ID_client,
         Client.Name,
-        func.count(Ticket.ID_client).label("count")
+        func.sum(ClientSalesDaily.Tickets).label("count")
     ).join(
-        Client, Ticket.ID_client == Client.ID_client
+        Client, ClientSalesDaily.ID_client == Client.ID_client
     ).group_by(
-        Ticket.ID_client, Client.Name
+        ClientSalesDaily.ID_client, Client.Name
     ).order_by(
         desc("count")
     ).limit(10).all()
@@ -55,15 +93,67 @@ def get_top_clients(db: Session = Depends(get_db)):
     return [{"ID_client": client[0], "Name": client[1], "count": client[2]} for client in top_clients]
 
 
-# Endpoint para obtener estadísticas por categoría
-@router.get("/category_stats")
-def get_category_stats(db: Session = Depends(get_db)):
-    # Implementación pendiente basada en los requisitos específicos
-    pass
+# Endpoint para obtener estadísticas por categoría (unidades e ingresos en el rango)
+@router.get("/category_stats", response_model=List[CategoryStatsResponse],
+            dependencies=[Depends(conditional("CategorySalesDaily", "Categories"))])
+def get_category_stats(response: Response, bounds: tuple = Depends(date_range)):
+    return aggregate(response, ("CategorySalesDaily", "Categories"), category_stats, *bounds)
+
+
+def category_stats(db: Session, date_from, date_to):
+    # Una sola consulta agrupada sobre el resumen diario (búsqueda por rango en la llave Day)
+    stats = db.query(
+        CategorySalesDaily.ID_Category,
+        Category.name,
+        func.sum(CategorySalesDaily.Lines).label("lines"),
+        func.sum(CategorySalesDaily.Units).label("units"),
+        func.sum(CategorySalesDaily.Revenue).label("revenue")
+    ).outerjoin(
+        Category, CategorySalesDaily.ID_Category == Category.ID_Category
+    ).filter(
+        CategorySalesDaily.Day >= date_from,
+        CategorySalesDaily.Day < date_to
+    ).group_by(
+        CategorySalesDaily.ID_Category, Category.name
+    ).order_by(
+        desc("revenue")
+    ).all()
+
+    return [
+        {"ID_Category": row[0], "name": row[1], "Lines": row[2], "Units": row[3], "Revenue": row[4]}
+        for row in stats
+    ]
 
 
 # Endpoint para obtener ventas por mes
-@router.get("/monthly_sales")
-def get_monthly_sales(db: Session = Depends(get_db)):
-    # Implementación pendiente basada en los requisitos específicos
-    pass
\ No newline at end of file
+@router.get("/monthly_sales", response_model=List[MonthlySalesResponse],
+            dependencies=[Depends(conditional("SalesDaily"))])
+def get_monthly_sales(response: Response, bounds: tuple = Depends(date_range)):
+    return aggregate(response, ("SalesDaily",), monthly_sales, *bounds)
+
+
+def monthly_sales(db: Session, date_from, date_to):
+    year = extract("year", SalesDaily.Day)
+    month = extract("month", SalesDaily.Day)
+
+    monthly = db.query(
+        year.label("year"),
+        month.label("month"),
+        func.sum(SalesDaily.Tickets),
+        func.sum(SalesDaily.Total)
+    ).filter(
+        SalesDaily.Day >= date_from,
+        SalesDaily.Day < date_to
+    ).group_by(
+        year, month
+    ).order_by(
+        year, month
+    ).all()
+
+    return [{"Year": row[0], "Month": row[1], "Tickets": row[2], "Total": row[3]} for row in monthly]
+
+
+# Estadísticas de los reportes compartidos (aciertos, cargas y peticiones agrupadas)
+@router.get("/cache/stats")
+def get_dashboard_cache_stats():
+    return aggregates.stats()
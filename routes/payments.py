@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import asyncio
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
-from sqlalchemy import func
-
-from dependences import get_db
-from models import CartTransaction, Product, Ticket, Client, User, PromotionalCode
+from sqlalchemy import func, insert, select, update
+
+import promos
+from broadcast import hub
+from dependences import get_db, get_async_db, date_range
+from exports import export_response
+from pagination import MAX_PAGE_SIZE, projection, schema_columns, keyset, as_dicts, page
+from rollups import record_ticket, record_cart_lines
+from stock import InsufficientStock, decrement_stock
+from models import CartTransaction, Product, Ticket, Client, PromotionalCode
 from schemas import CartTransactionResponse, CartTransactionBase, TicketResponse, TicketBase, CartUpdateRequest, \
-    ClientResponse, ClientBase, PromotionalCodeBase, PromotionalCodeResponse, TicketDetailResponse
+    ClientResponse, ClientBase, PromotionalCodeBase, PromotionalCodeResponse, PromotionalCodeLookup, \
+    TicketDetailResponse, CheckoutResponse
 
 # Instancia de router
 router = APIRouter(tags=["Payments"])
@@ -16,9 +26,9 @@ router = APIRouter(tags=["Payments"])
 
 # Endpoints para CartTransactions
 @router.post("/cart", response_model=CartTransactionResponse, status_code=status.HTTP_201_CREATED)
-def create_cart_transaction(transaction: CartTransactionBase, db: Session = Depends(get_db)):
+async def create_cart_transaction(transaction: CartTransactionBase, db: AsyncSession = Depends(get_async_db)):
     # Verificar si el producto existe y obtener su precio
-    product = db.query(Product).filter(Product.ID_product == transaction.ID_Product).first()
+    product = await db.get(Product, transaction.ID_Product)
 
     if not product:
         raise HTTPException(
@@ -41,72 +51,162 @@ def create_cart_transaction(transaction: CartTransactionBase, db: Session = Depe
     )
 
     db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
+    await db.commit()
+    await db.refresh(db_transaction)
 
     return db_transaction
 
 
+# Endpoint para agregar varias líneas al carrito en una sola llamada
+@router.post("/cart/batch", response_model=List[CartTransactionResponse], status_code=status.HTTP_201_CREATED)
+async def create_cart_transactions_batch(transactions: List[CartTransactionBase],
+                                         db: AsyncSession = Depends(get_async_db)):
+    if not transactions:
+        return []
+
+    # Obtener los precios de todos los productos con una sola consulta
+    product_ids = {transaction.ID_Product for transaction in transactions}
+    prices = dict((await db.execute(
+        select(Product.ID_product, Product.Price_Sell).where(Product.ID_product.in_(product_ids))
+    )).all())
+
+    missing = sorted(product_ids - prices.keys())
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Products not found: {missing}"
+        )
+
+    order_date = datetime.now()
+    rows = [
+        {
+            "ID_User": transaction.ID_User,
+            "ID_Product": transaction.ID_Product,
+            "Quantity": transaction.Quantity,
+            "Total_amount": prices[transaction.ID_Product] * transaction.Quantity,
+            "Payment_method": transaction.Payment_method,
+            "Order_date": order_date,
+            "Order_status": transaction.Order_status
+        }
+        for transaction in transactions
+    ]
+
+    # Insertar todas las filas en un solo executemany y confirmar una vez
+    created = await db.scalars(
+        insert(CartTransaction).returning(CartTransaction, sort_by_parameter_order=True), rows
+    )
+    created = created.all()
+    await db.commit()
+
+    return created
+
+
 @router.get("/cart", response_model=List[CartTransactionResponse])
-def get_cart_transactions(user: Optional[int] = None, db: Session = Depends(get_db)):
+async def get_cart_transactions(response: Response, user: Optional[int] = None, after: Optional[int] = None,
+                                limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                                fields: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
     if user:
-        transactions = db.query(CartTransaction).filter(
+        stmt = select(CartTransaction).where(
             CartTransaction.ID_User == user,
             CartTransaction.Order_status == "Pendiente"
-        ).all()
+        )
     else:
-        transactions = db.query(CartTransaction).all()
+        stmt = select(CartTransaction)
+
+    columns = projection(CartTransaction, fields, CartTransactionResponse)
+    stmt = keyset(stmt, CartTransaction.ID_Transaction, after, limit,
+                  columns or schema_columns(CartTransaction, CartTransactionResponse))
+    transactions = as_dicts(await db.execute(stmt))
 
-    return transactions
+    return page(transactions, CartTransaction.ID_Transaction, limit, response, CartTransactionResponse,
+                projected=bool(columns))
 
 
 @router.put("/cart", status_code=status.HTTP_200_OK)
-def update_cart_transactions(data: CartUpdateRequest, db: Session = Depends(get_db)):
+async def update_cart_transactions(data: CartUpdateRequest, db: AsyncSession = Depends(get_async_db)):
     # Actualizar todas las transacciones pendientes del usuario con el ID del ticket
-    result = db.query(CartTransaction).filter(
+    completed = (await db.execute(update(CartTransaction).where(
         CartTransaction.ID_User == data.ID_user,
         CartTransaction.Order_status == "Pendiente"
-    ).update({
-        "ID_Ticket": data.ID_ticket,
-        "Order_status": "Completado"
-    })
-
-    if result == 0:
+    ).values(
+        ID_Ticket=data.ID_ticket,
+        Order_status="Completado"
+    ).returning(
+        CartTransaction.ID_Product, CartTransaction.Quantity, CartTransaction.Total_amount, CartTransaction.Order_date
+    ))).all()
+
+    if not completed:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No pending cart transactions found for this user"
         )
 
-    db.commit()
+    # Descontar inventario y actualizar los resúmenes diarios en la misma transacción
+    remaining, low_stock = await complete_sale(db, completed)
+    await db.run_sync(record_cart_lines, completed)
+    await db.commit()
+
+    publish_sale({
+        "ID_user": data.ID_user,
+        "ID_ticket": data.ID_ticket,
+        "count": len(completed),
+        "Total_amount": sum((row.Total_amount or 0 for row in completed), Decimal(0))
+    }, remaining, low_stock)
+
+    return {"status": "Cart transactions updated", "count": len(completed), "low_stock": low_stock}
+
+
+# Descontar el inventario de una venta; si no alcanza la existencia se revierte todo
+async def complete_sale(db: AsyncSession, rows):
+    try:
+        return await db.run_sync(decrement_stock, rows)
+    except InsufficientStock as error:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Insufficient stock for product {error.product_id}"
+        )
+
+
+# Avisar a los clientes suscritos por WebSocket (solo después de confirmar la transacción)
+def publish_sale(sale, remaining, low_stock):
+    hub.publish("sales", sale)
+    if remaining:
+        hub.publish("stock", [{"ID_product": product_id, "Quantity": quantity}
+                              for product_id, quantity in remaining.items()])
+    for alert in low_stock:
+        hub.publish("low_stock", alert)
 
-    return {"status": "Cart transactions updated", "count": result}
+
+# Calcular el precio final aplicando el código promocional (si existe), desde los códigos en memoria.
+# Solo un código que no está en memoria (creado en otro worker) se consulta en la base de datos.
+async def apply_promo_code(db: AsyncSession, id_code: Optional[int], pre_price):
+    if not id_code:
+        return pre_price
+
+    if promos.stale():
+        await asyncio.to_thread(promos.refresh)
+
+    promo = promos.promo_codes.get(id_code) or await db.run_sync(promos.fetch_id, id_code)
+    try:
+        return promos.apply(promo, pre_price)
+    except promos.PromoExpired:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Promotional code has expired"
+        )
 
 
 # Endpoints para Tickets
 @router.post("/tickets", response_model=TicketResponse, status_code=status.HTTP_201_CREATED)
-def create_ticket(ticket: TicketBase, db: Session = Depends(get_db)):
+async def create_ticket(ticket: TicketBase, db: AsyncSession = Depends(get_async_db)):
     # Calcular el precio previo (suma de transacciones pendientes)
-    pre_price = db.query(func.sum(CartTransaction.Total_amount)).filter(
+    pre_price = await db.scalar(select(func.sum(CartTransaction.Total_amount)).where(
         CartTransaction.ID_User == ticket.ID_user,
         CartTransaction.Order_status == "Pendiente"
-    ).scalar() or 0
-
-    final_price = pre_price
+    )) or 0
 
-    # Si hay un código promocional, aplicar descuento
-    if ticket.ID_Code:
-        promo_code = db.query(PromotionalCode).filter(PromotionalCode.ID_Code == ticket.ID_Code).first()
-
-        if promo_code and promo_code.IsActive:
-            # Verificar si el código ha expirado
-            if promo_code.ExpirationDate and promo_code.ExpirationDate < datetime.now():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Promotional code has expired"
-                )
-
-            discount = promo_code.Discount
-            final_price = pre_price - (pre_price * (discount / 100))
+    final_price = await apply_promo_code(db, ticket.ID_Code, pre_price)
 
     # Crear el ticket
     db_ticket = Ticket(
@@ -120,16 +220,162 @@ def create_ticket(ticket: TicketBase, db: Session = Depends(get_db)):
     )
 
     db.add(db_ticket)
-    db.commit()
-    db.refresh(db_ticket)
+    await db.run_sync(record_ticket, db_ticket)
+    await db.commit()
+    await db.refresh(db_ticket)
+
+    hub.publish("sales", TicketResponse.model_validate(db_ticket).model_dump())
 
     return db_ticket
 
 
+# Endpoint de cobro: totaliza, aplica el código, crea el ticket y cierra el carrito en una sola transacción
+@router.post("/checkout", response_model=CheckoutResponse, status_code=status.HTTP_201_CREATED)
+async def checkout(ticket: TicketBase, response: Response, db: AsyncSession = Depends(get_async_db)):
+    timings = {}
+    start = time.perf_counter()
+
+    def mark(stage):
+        nonlocal start
+        now = time.perf_counter()
+        timings[stage] = round((now - start) * 1000, 3)
+        start = now
+
+    # Tomar el conjunto exacto de transacciones pendientes que se van a cobrar
+    pending = (await db.execute(
+        select(
+            CartTransaction.ID_Transaction, CartTransaction.ID_Product, CartTransaction.Quantity,
+            CartTransaction.Total_amount, CartTransaction.Order_date
+        ).where(
+            CartTransaction.ID_User == ticket.ID_user,
+            CartTransaction.Order_status == "Pendiente"
+        ).with_for_update()
+    )).all()
+
+    if not pending:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No pending cart transactions found for this user"
+        )
+
+    transaction_ids = [row.ID_Transaction for row in pending]
+    pre_price = sum((row.Total_amount or 0 for row in pending), Decimal(0))
+    mark("cart_total")
+
+    final_price = await apply_promo_code(db, ticket.ID_Code, pre_price)
+    mark("promo")
+
+    # Crear el ticket (flush para obtener su ID sin confirmar todavía)
+    db_ticket = Ticket(
+        ID_client=ticket.ID_client,
+        ID_user=ticket.ID_user,
+        ID_Code=ticket.ID_Code,
+        Issue_details=ticket.Issue_details,
+        Prev_Price=pre_price,
+        Final_Price=final_price,
+        Created_at=datetime.now()
+    )
+    db.add(db_ticket)
+    await db.flush()
+    mark("ticket_insert")
+
+    # Marcar solo las transacciones totalizadas; si otro cobro las tomó, se revierte todo
+    result = await db.execute(update(CartTransaction).where(
+        CartTransaction.ID_Transaction.in_(transaction_ids),
+        CartTransaction.Order_status == "Pendiente"
+    ).values(
+        ID_Ticket=db_ticket.ID_ticket,
+        Order_status="Completado"
+    ))
+
+    if result.rowcount != len(transaction_ids):
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cart changed during checkout, please retry"
+        )
+    mark("cart_update")
+
+    remaining, low_stock = await complete_sale(db, pending)
+    mark("stock")
+
+    await db.run_sync(record_ticket, db_ticket)
+    await db.run_sync(record_cart_lines, pending)
+    mark("rollups")
+
+    await db.commit()
+    mark("commit")
+
+    sale = {column.name: getattr(db_ticket, column.name) for column in Ticket.__table__.columns}
+    publish_sale({**sale, "count": len(transaction_ids)}, remaining, low_stock)
+    mark("publish")
+
+    timings["total"] = round(sum(timings.values()), 3)
+    response.headers["Server-Timing"] = ", ".join(f"{stage};dur={ms}" for stage, ms in timings.items())
+
+    return {
+        **sale,
+        "count": len(transaction_ids),
+        "low_stock": low_stock,
+        "timings": timings
+    }
+
+
+# Cargar un ticket con su cliente, usuario y transacciones en un número fijo de consultas
+def ticket_details_query():
+    return select(Ticket).options(
+        joinedload(Ticket.client),
+        joinedload(Ticket.user),
+        selectinload(Ticket.cart_transactions)
+    )
+
+
+def ticket_detail(ticket):
+    return {
+        **{column.key: getattr(ticket, column.key) for column in Ticket.__table__.columns},
+        "client_name": ticket.client.Name if ticket.client else "",
+        "user_name": ticket.user.Username if ticket.user else "",
+        "cart_transactions": ticket.cart_transactions
+    }
+
+
+# Endpoint para obtener el detalle de varios tickets (por IDs o por rango de fechas)
+@router.get("/tickets", response_model=List[TicketDetailResponse])
+def get_tickets_details(response: Response, ids: Optional[List[int]] = Query(None),
+                        date_from: Optional[datetime] = Query(None, alias="from"),
+                        date_to: Optional[datetime] = Query(None, alias="to"),
+                        after: Optional[int] = None, limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                        db: Session = Depends(get_db)):
+    if not ids and not (date_from or date_to):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide ticket ids or a from/to date range"
+        )
+
+    if ids and len(ids) > MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_PAGE_SIZE} ticket ids per request"
+        )
+
+    stmt = ticket_details_query()
+    if ids:
+        stmt = stmt.where(Ticket.ID_ticket.in_(ids))
+    if date_from:
+        stmt = stmt.where(Ticket.Created_at >= date_from)
+    if date_to:
+        stmt = stmt.where(Ticket.Created_at < date_to)
+
+    tickets = db.scalars(keyset(stmt, Ticket.ID_ticket, after, limit)).unique().all()
+
+    return page([ticket_detail(ticket) for ticket in tickets], Ticket.ID_ticket, limit, response,
+                TicketDetailResponse)
+
+
 @router.get("/tickets/{ticket_id}", response_model=TicketDetailResponse)
 def get_ticket_details(ticket_id: int, db: Session = Depends(get_db)):
     # Obtener el ticket con las relaciones
-    ticket = db.query(Ticket).filter(Ticket.ID_ticket == ticket_id).first()
+    ticket = db.scalar(ticket_details_query().where(Ticket.ID_ticket == ticket_id))
 
     if not ticket:
         raise HTTPException(
@@ -137,22 +383,32 @@ def get_ticket_details(ticket_id: int, db: Session = Depends(get_db)):
             detail="Ticket not found"
         )
 
-    # Obtener detalles del cliente y usuario
-    client = db.query(Client).filter(Client.ID_client == ticket.ID_client).first()
-    user = db.query(User).filter(User.ID_user == ticket.ID_user).first()
+    return ticket_detail(ticket)
 
-    # Obtener transacciones del carrito
-    cart_transactions = db.query(CartTransaction).filter(CartTransaction.ID_Ticket == ticket_id).all()
 
-    # Construir respuesta
-    response = {
-        **ticket.__dict__,
-        "client_name": client.Name if client else "",
-        "user_name": user.Username if user else "",
-        "cart_transactions": cart_transactions
-    }
+# Exportaciones para contabilidad: CSV o NDJSON en streaming por rango de fechas [from, to)
+@router.get("/export/tickets")
+async def export_tickets(request: Request, format: str = Query("csv", pattern="^(csv|ndjson)$"),
+                         bounds: tuple = Depends(date_range)):
+    date_from, date_to = (datetime.combine(bound, datetime.min.time()) for bound in bounds)
+    stmt = select(*Ticket.__table__.columns).where(
+        Ticket.Created_at >= date_from,
+        Ticket.Created_at < date_to
+    ).order_by(Ticket.Created_at, Ticket.ID_ticket)
 
-    return response
+    return export_response(request, stmt, format, f"tickets_{bounds[0]}_{bounds[1]}")
+
+
+@router.get("/export/cart")
+async def export_cart_transactions(request: Request, format: str = Query("csv", pattern="^(csv|ndjson)$"),
+                                   bounds: tuple = Depends(date_range)):
+    date_from, date_to = bounds
+    stmt = select(*CartTransaction.__table__.columns).where(
+        CartTransaction.Order_date >= date_from,
+        CartTransaction.Order_date < date_to
+    ).order_by(CartTransaction.Order_date, CartTransaction.ID_Transaction)
+
+    return export_response(request, stmt, format, f"cart_{date_from}_{date_to}")
 
 
 # Endpoints para Clientes
@@ -172,9 +428,15 @@ def create_client(client: ClientBase, db: Session = Depends(get_db)):
 
 
 @router.get("/clients", response_model=List[ClientResponse])
-def get_clients(db: Session = Depends(get_db)):
-    clients = db.query(Client).all()
-    return clients
+def get_clients(response: Response, after: Optional[int] = None,
+                limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), fields: Optional[str] = None,
+                db: Session = Depends(get_db)):
+    columns = projection(Client, fields, ClientResponse)
+    stmt = keyset(select(Client), Client.ID_client, after, limit,
+                  columns or schema_columns(Client, ClientResponse))
+    clients = as_dicts(db.execute(stmt))
+
+    return page(clients, Client.ID_client, limit, response, ClientResponse, projected=bool(columns))
 
 
 # Endpoints para Códigos Promocionales
@@ -190,5 +452,23 @@ def create_promo_code(promo: PromotionalCodeBase, db: Session = Depends(get_db))
     db.add(db_promo)
     db.commit()
     db.refresh(db_promo)
+    promos.index_promo(db_promo)
+
+    return db_promo
+
+
+# Validar un código escrito en la caja (sin distinguir mayúsculas) sin consultar la base de datos
+@router.get("/promocodes/{code}", response_model=PromotionalCodeLookup)
+async def lookup_promo_code(code: str, db: AsyncSession = Depends(get_async_db)):
+    if promos.stale():
+        await asyncio.to_thread(promos.refresh)
+
+    promo = promos.promo_codes.find(code) or await db.run_sync(promos.fetch_code, code)
+    if not promo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Promotional code not found"
+        )
 
-    return db_promo
\ No newline at end of file
+    is_expired = promos.expired(promo, date.today())
+    return {**promo, "expired": is_expired, "valid": bool(promo["IsActive"]) and not is_expired}
\ No newline at end of file
@@ -1,14 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import io
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, Response, UploadFile, \
+    status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from dependences import get_db
+from cache import TTLCache
+import catalog
+from broadcast import hub
+from config import CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL
+from dependences import get_db, get_async_db, get_current_user
+from imports import import_products
+from pagination import MAX_PAGE_SIZE, projection, schema_columns, keyset, as_dicts, page, render_page, respond
+from versions import conditional, version
 from models import Product, Category, ProductCategory, CartTransaction, Notification, Provider
 from schemas import ProductResponse, ProductBase, CategoryResponse, ProductCategoryBase, NotificationResponse, \
-    NotificationBase, ProviderResponse, ProviderBase
+    NotificationBase, ProviderResponse, ProviderBase, ScanBatchRequest, ScanBatchResponse, ProductSearchResult, \
+    ProductImportResponse
 
 # Instancia de router
-router = APIRouter(tags=["Point of Sale"])
+router = APIRouter(tags=["Point of Sale"], dependencies=[Depends(get_current_user)])
+
+# Caché de lecturas del catálogo (productos, categorías y sus relaciones)
+catalog_cache = TTLCache(maxsize=CATALOG_CACHE_SIZE, ttl=CATALOG_CACHE_TTL)
 
 
 # Endpoints para Productos
@@ -30,19 +46,105 @@ def create_product(product: ProductBase, db: Session = Depends(get_db)):
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    catalog_cache.clear()
+    hub.publish("catalog", {"action": "created", "product": catalog.index_product(db_product)})
     return db_product
 
 
-@router.get("/products", response_model=List[ProductResponse])
-def get_products(category: Optional[int] = None, prod: Optional[int] = None, db: Session = Depends(get_db)):
+@router.get("/products", response_model=List[ProductResponse],
+            dependencies=[Depends(conditional("Products", "ProductCategories"))])
+async def get_products(response: Response, category: Optional[int] = None, prod: Optional[int] = None,
+                       after: Optional[int] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                       fields: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
     if prod:
-        products = db.query(Product).filter(Product.ID_product == prod).all()
+        stmt = select(Product).where(Product.ID_product == prod)
     elif category:
-        products = db.query(Product).join(ProductCategory).filter(ProductCategory.ID_Category == category).all()
+        stmt = select(Product).join(ProductCategory).where(ProductCategory.ID_Category == category)
     else:
-        products = db.query(Product).all()
+        stmt = select(Product)
+
+    columns = projection(Product, fields, ProductResponse)
+    # Las versiones de las tablas invalidan la caché también ante cambios de existencias por ventas.
+    # Se guarda el JSON ya generado: una página en caché no se vuelve a serializar.
+    cache_key = ("products", version("Products", "ProductCategories"), category, prod, after, limit, fields)
+    cached = catalog_cache.get(cache_key)
+
+    if cached is None:
+        stmt = keyset(stmt, Product.ID_product, after, limit, columns or schema_columns(Product, ProductResponse))
+        products = as_dicts(await db.execute(stmt))
+        cached = render_page(products, Product.ID_product, limit, ProductResponse, projected=bool(columns))
+        catalog_cache.set(cache_key, cached)
+
+    return respond(*cached, response)
+
+
+# Endpoint de búsqueda por nombre, SKU o color (prefijos y errores de tipeo) con ranking
+@router.get("/products/search", response_model=List[ProductSearchResult])
+async def search_products(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=200),
+                          fuzzy: bool = True):
+    if catalog.stale():
+        await asyncio.to_thread(catalog.refresh)
+
+    return catalog.search_index.search(q, limit=limit, fuzzy=fuzzy)
+
+
+# Endpoint del escáner: busca un producto por SKU en el índice en memoria
+@router.get("/products/scan/{sku}", response_model=ProductResponse)
+async def scan_product(sku: str):
+    if catalog.stale():
+        await asyncio.to_thread(catalog.refresh)
+
+    product = catalog.sku_index.get(sku)
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+
+    return product
+
+
+# Endpoint del escáner para varios códigos a la vez
+@router.post("/products/scan", response_model=ScanBatchResponse)
+async def scan_products(data: ScanBatchRequest):
+    if catalog.stale():
+        await asyncio.to_thread(catalog.refresh)
 
-    return products
+    products = catalog.sku_index.get_many(data.SKUs)
+
+    return {
+        "found": {sku: product for sku, product in products.items() if product},
+        "missing": [sku for sku, product in products.items() if not product]
+    }
+
+
+# Endpoint para importar productos en bloque (CSV o JSON Lines) creando o actualizando por SKU.
+# Columnas: las de ProductBase más Categories (IDs separados por ";" en CSV, lista en JSON)
+@router.post("/products/import", response_model=ProductImportResponse)
+def import_products_file(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                         format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"),
+                         db: Session = Depends(get_db)):
+    fmt = format or ("jsonl" if (file.filename or "").endswith((".jsonl", ".ndjson")) else "csv")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+
+    try:
+        result = import_products(db, stream, fmt)
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be UTF-8 encoded"
+        )
+    finally:
+        stream.detach()
+
+    db.commit()
+    catalog_cache.clear()
+    # Los índices de búsqueda y escaneo se recargan después de responder
+    background_tasks.add_task(catalog.reload)
+    hub.publish("catalog", {"action": "imported", "inserted": result["inserted"], "updated": result["updated"]})
+
+    return result
 
 
 @router.put("/products/{product_id}", response_model=ProductResponse)
@@ -60,15 +162,13 @@ def update_product(product_id: int, product: ProductBase, db: Session = Depends(
 
     db.commit()
     db.refresh(db_product)
+    catalog_cache.clear()
+    hub.publish("catalog", {"action": "updated", "product": catalog.index_product(db_product)})
     return db_product
 
 
 @router.delete("/products/{product_id}", status_code=status.HTTP_200_OK)
 def delete_product(product_id: int, db: Session = Depends(get_db)):
-    # Primero eliminar las referencias en ProductCategories
-    db.query(ProductCategory).filter(ProductCategory.ID_Product == product_id).delete()
-
-    # Ahora eliminar el producto
     product = db.query(Product).filter(Product.ID_product == product_id).first()
 
     if not product:
@@ -77,21 +177,38 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
             detail="Product not found"
         )
 
+    # Primero eliminar las referencias en ProductCategories (por el ORM, así quedan registradas para
+    # la sincronización de las cajas) y luego el producto
+    for link in product.categories:
+        db.delete(link)
     db.delete(product)
     db.commit()
+    catalog_cache.clear()
+    catalog.unindex_product(product_id)
+    hub.publish("catalog", {"action": "deleted", "ID_product": product_id})
 
     return {"status": f"Product with ID {product_id} deleted successfully"}
 
 
 # Endpoints para Categorías
-@router.get("/categories", response_model=List[CategoryResponse])
-def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(Category).all()
+@router.get("/categories", response_model=List[CategoryResponse], dependencies=[Depends(conditional("Categories"))])
+async def get_categories(db: AsyncSession = Depends(get_async_db)):
+    categories = catalog_cache.get(("categories",))
+
+    if categories is None:
+        categories = [CategoryResponse.model_validate(row).model_dump() for row in await db.scalars(select(Category))]
+        catalog_cache.set(("categories",), categories)
+
     return categories
 
 
-@router.get("/categories/{category_id}", response_model=CategoryResponse)
+@router.get("/categories/{category_id}", response_model=CategoryResponse,
+            dependencies=[Depends(conditional("Categories"))])
 def get_category(category_id: int, db: Session = Depends(get_db)):
+    category = catalog_cache.get(("category", category_id))
+    if category is not None:
+        return category
+
     category = db.query(Category).filter(Category.ID_Category == category_id).first()
 
     if not category:
@@ -100,9 +217,17 @@ def get_category(category_id: int, db: Session = Depends(get_db)):
             detail="Category not found"
         )
 
+    category = CategoryResponse.model_validate(category).model_dump()
+    catalog_cache.set(("category", category_id), category)
     return category
 
 
+# Estadísticas de la caché del catálogo (aciertos, fallos, desalojos)
+@router.get("/cache/stats")
+def get_catalog_cache_stats():
+    return catalog_cache.stats()
+
+
 # Endpoint para ProductCategory (agregar un producto a una categoría)
 @router.post("/productcategory", status_code=status.HTTP_201_CREATED)
 def add_product_category(data: ProductCategoryBase, db: Session = Depends(get_db)):
@@ -130,6 +255,9 @@ def add_product_category(data: ProductCategoryBase, db: Session = Depends(get_db
 
     db.add(db_product_category)
     db.commit()
+    catalog_cache.clear()
+    hub.publish("catalog", {"action": "category_added", "ID_product": data.ID_Product,
+                            "ID_Category": data.ID_Category})
 
     return {"status": "Category added to product"}
 
@@ -148,10 +276,18 @@ def create_notification(notification: NotificationBase, db: Session = Depends(ge
     return db_notification
 
 
-@router.get("/notifications", response_model=List[NotificationResponse])
-def get_notifications(db: Session = Depends(get_db)):
-    notifications = db.query(Notification).all()
-    return notifications
+@router.get("/notifications", response_model=List[NotificationResponse],
+            dependencies=[Depends(conditional("Notifications"))])
+def get_notifications(response: Response, after: Optional[int] = None,
+                      limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), fields: Optional[str] = None,
+                      db: Session = Depends(get_db)):
+    columns = projection(Notification, fields, NotificationResponse)
+    stmt = keyset(select(Notification), Notification.ID_Notification, after, limit,
+                  columns or schema_columns(Notification, NotificationResponse))
+    notifications = as_dicts(db.execute(stmt))
+
+    return page(notifications, Notification.ID_Notification, limit, response, NotificationResponse,
+                projected=bool(columns))
 
 
 @router.put("/notifications/{notification_id}", response_model=NotificationResponse)
@@ -203,7 +339,13 @@ def create_provider(provider: ProviderBase, db: Session = Depends(get_db)):
     return db_provider
 
 
-@router.get("/providers", response_model=List[ProviderResponse])
-def get_providers(db: Session = Depends(get_db)):
-    providers = db.query(Provider).all()
-    return providers
\ No newline at end of file
+@router.get("/providers", response_model=List[ProviderResponse], dependencies=[Depends(conditional("Providers"))])
+def get_providers(response: Response, after: Optional[int] = None,
+                  limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), fields: Optional[str] = None,
+                  db: Session = Depends(get_db)):
+    columns = projection(Provider, fields, ProviderResponse)
+    stmt = keyset(select(Provider), Provider.ID_provider, after, limit,
+                  columns or schema_columns(Provider, ProviderResponse))
+    providers = as_dicts(db.execute(stmt))
+
+    return page(providers, Provider.ID_provider, limit, response, ProviderResponse, projected=bool(columns))
@@ -0,0 +1,173 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import promos
+from broadcast import hub
+from changes import changes
+from dependences import get_db, get_current_user
+from models import CartTransaction, Product, Ticket
+from rollups import record_tickets, record_cart_lines
+from schemas import SyncRequest, SyncResponse
+from stock import decrement_stock
+
+# Instancia de router (cajas registradoras que trabajan sin conexión)
+router = APIRouter(tags=["Sync"], dependencies=[Depends(get_current_user)])
+
+
+# Registrar en bloque las ventas hechas sin conexión: tickets, transacciones completadas, inventario
+# y resúmenes diarios. Client_ref (único por venta en la caja) evita duplicarlas si se reenvían.
+def apply_offline_sales(db: Session, sales):
+    results = {}
+    unique = {}
+    for sale in sales:
+        unique.setdefault(sale.Client_ref, sale)
+
+    for client_ref, ticket_id, final_price in db.execute(
+        select(Ticket.Client_ref, Ticket.ID_ticket, Ticket.Final_Price).where(Ticket.Client_ref.in_(unique))
+    ):
+        results[client_ref] = {"Client_ref": client_ref, "status": "duplicate", "ID_ticket": ticket_id,
+                               "Final_Price": final_price}
+        del unique[client_ref]
+
+    # Precios de todo el lote con una sola consulta (los códigos promocionales están en memoria)
+    product_ids = {line.ID_Product for sale in unique.values() for line in sale.lines}
+    prices = dict(db.execute(
+        select(Product.ID_product, Product.Price_Sell).where(Product.ID_product.in_(product_ids))
+    ).all())
+    if promos.stale():
+        promos.refresh()
+
+    tickets, lines = [], defaultdict(list)
+    for client_ref, sale in unique.items():
+        missing = sorted({line.ID_Product for line in sale.lines} - prices.keys())
+        if missing:
+            results[client_ref] = {"Client_ref": client_ref, "status": "error",
+                                   "error": f"Products not found: {missing}"}
+            continue
+
+        for line in sale.lines:
+            lines[client_ref].append({
+                "ID_User": sale.ID_user,
+                "ID_Product": line.ID_Product,
+                "Quantity": line.Quantity,
+                "Total_amount": (prices[line.ID_Product] or 0) * line.Quantity,
+                "Payment_method": sale.Payment_method,
+                "Order_date": sale.Created_at.date(),
+                "Order_status": "Completado"
+            })
+        pre_price = sum((line["Total_amount"] for line in lines[client_ref]), Decimal(0))
+
+        # El código debe estar vigente a la fecha de la venta, no a la de la sincronización
+        promo = sale.ID_Code and (promos.promo_codes.get(sale.ID_Code) or promos.fetch_id(db, sale.ID_Code))
+        try:
+            final_price = promos.apply(promo, pre_price, sale.Created_at.date())
+        except promos.PromoExpired:
+            del lines[client_ref]
+            results[client_ref] = {"Client_ref": client_ref, "status": "error",
+                                   "error": "Promotional code had expired at the time of the sale"}
+            continue
+
+        tickets.append({
+            "ID_client": sale.ID_client,
+            "ID_user": sale.ID_user,
+            "ID_Code": sale.ID_Code,
+            "Issue_details": sale.Issue_details,
+            "Prev_Price": pre_price,
+            "Final_Price": final_price,
+            "Created_at": sale.Created_at,
+            "Client_ref": client_ref
+        })
+
+    remaining, low_stock, created = {}, [], []
+    if tickets:
+        table = Ticket.__table__
+        created = db.execute(insert(table).returning(
+            table.c.Client_ref, table.c.ID_ticket, table.c.ID_client, table.c.ID_user, table.c.Final_Price,
+            table.c.Created_at
+        ), tickets).all()
+
+        rows = [{**line, "ID_Ticket": ticket.ID_ticket}
+                for ticket in created for line in lines[ticket.Client_ref]]
+        transactions = CartTransaction.__table__
+        completed = db.execute(insert(transactions).returning(
+            transactions.c.ID_Product, transactions.c.Quantity, transactions.c.Total_amount,
+            transactions.c.Order_date
+        ), rows).all()
+
+        # La venta ya se entregó: el inventario se descuenta aunque quede negativo
+        remaining, low_stock = decrement_stock(db, completed, allow_negative=True)
+        record_tickets(db, created)
+        record_cart_lines(db, completed)
+
+        for ticket in created:
+            results[ticket.Client_ref] = {"Client_ref": ticket.Client_ref, "status": "created",
+                                          "ID_ticket": ticket.ID_ticket, "Final_Price": ticket.Final_Price}
+
+    # Una venta repetida dentro del mismo lote se informa como duplicada de la primera
+    reported = set()
+    response = []
+    for sale in sales:
+        result = results[sale.Client_ref]
+        if sale.Client_ref in reported:
+            result = {**result, "status": "duplicate", "error": None}
+        reported.add(sale.Client_ref)
+        response.append(result)
+
+    return response, created, remaining, low_stock
+
+
+# Sincronizar una caja: sube las ventas pendientes y recibe los cambios del catálogo desde su último token.
+# El cliente aplica primero las eliminaciones y luego las filas recibidas, y guarda el token nuevo.
+@router.post("", response_model=SyncResponse)
+def sync_terminal(data: SyncRequest, db: Session = Depends(get_db)):
+    if data.token and not data.token.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+
+    sales, created, remaining, low_stock = [], [], {}, []
+    if data.sales:
+        try:
+            sales, created, remaining, low_stock = apply_offline_sales(db, data.sales)
+            db.commit()
+        except IntegrityError:
+            # Otra sincronización registró alguna de estas ventas al mismo tiempo
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Sales were synced concurrently, please retry"
+            )
+
+        for ticket in created:
+            hub.publish("sales", {**ticket._asdict(), "offline": True})
+        if remaining:
+            hub.publish("stock", [{"ID_product": product_id, "Quantity": quantity}
+                                  for product_id, quantity in remaining.items()])
+        for alert in low_stock:
+            hub.publish("low_stock", alert)
+
+    catalog = changes(db, int(data.token or 0))
+    deleted = catalog["deleted"]
+
+    return {
+        "token": str(catalog["version"]),
+        "full": catalog["full"],
+        "products": catalog["Products"],
+        "categories": catalog["Categories"],
+        "product_categories": catalog["ProductCategories"],
+        "promo_codes": catalog["PromotionalCodes"],
+        "deleted": {
+            "products": deleted["Products"],
+            "categories": deleted["Categories"],
+            "product_categories": deleted["ProductCategories"],
+            "promo_codes": deleted["PromotionalCodes"]
+        },
+        "sales": sales,
+        "low_stock": low_stock
+    }
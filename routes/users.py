@@ -1,25 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
-from dependences import get_db
+from dependences import get_db, get_async_db
+from pagination import MAX_PAGE_SIZE, projection, schema_columns, keyset, as_dicts, page
 from models import User
-from passlib.context import CryptContext
+from security import hasher, user_versions
 
 from schemas import UserResponse, UserUpdate
 
 # Instancia de router
 router = APIRouter(tags=["Users"])
 
-# Instancia de CryptContext para hash de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 # Endpoint para obtener todos los usuarios
 @router.get("/", response_model=List[UserResponse])
-def get_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return users
+def get_users(response: Response, after: Optional[int] = None,
+              limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), fields: Optional[str] = None,
+              db: Session = Depends(get_db)):
+    columns = projection(User, fields, UserResponse)
+    stmt = keyset(select(User), User.ID_user, after, limit, columns or schema_columns(User, UserResponse))
+    users = as_dicts(db.execute(stmt))
+
+    return page(users, User.ID_user, limit, response, UserResponse, projected=bool(columns))
 
 
 # Endpoint para obtener un usuario específico
@@ -38,8 +43,8 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 
 # Endpoint para actualizar un usuario
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.ID_user == user_id).first()
+async def update_user(user_id: int, user_update: UserUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.get(User, user_id)
 
     if not db_user:
         raise HTTPException(
@@ -52,7 +57,7 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
 
     # Si se proporciona una nueva contraseña, hacer hash
     if "Password" in update_data and update_data["Password"]:
-        update_data["Password"] = pwd_context.hash(update_data["Password"])
+        update_data["Password"] = await hasher.hash(update_data["Password"])
 
     # Actualizar la marca de tiempo
     update_data["UpdatedAt"] = datetime.now()
@@ -60,8 +65,10 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
     for field, value in update_data.items():
         setattr(db_user, field, value)
 
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    # Los tokens emitidos antes de este cambio quedan revocados en este worker de inmediato
+    user_versions.pop(user_id)
 
     return db_user
 
@@ -79,5 +86,6 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
 
     db.delete(db_user)
     db.commit()
+    user_versions.pop(user_id)
 
     return {"status": f"User with ID {user_id} deleted successfully"}
\ No newline at end of file
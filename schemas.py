@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -19,11 +19,57 @@ class ProductBase(BaseModel):
 
 class ProductResponse(ProductBase):
     ID_product: int
+    # NULL en productos sin existencia registrada (no se controla su inventario)
+    Quantity: Optional[int] = None
 
     class Config:
         from_attributes = True
 
 
+class ProductSearchResult(ProductResponse):
+    score: float
+
+
+class ScanBatchRequest(BaseModel):
+    SKUs: List[str]
+
+
+class ScanBatchResponse(BaseModel):
+    found: Dict[str, ProductResponse]
+    missing: List[str]
+
+
+class ProductImportRow(BaseModel):
+    SKU: str
+    Product_name: Optional[str] = None
+    Quantity: Optional[int] = None
+    Color: Optional[str] = None
+    ID_provider: Optional[int] = None
+    Price_Sell: Optional[float] = None
+    Price_Buy: Optional[float] = None
+    Image_URL: Optional[str] = None
+    Image_URL2: Optional[str] = None
+    Image_URL3: Optional[str] = None
+    Categories: List[int] = []
+
+
+class ProductImportError(BaseModel):
+    line: int
+    SKU: Optional[str] = None
+    error: str
+
+
+class ProductImportResponse(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    linked: int
+    failed: int
+    seconds: float
+    rows_per_second: float
+    errors: List[ProductImportError]
+
+
 class CategoryBase(BaseModel):
     name: str
     img_url: Optional[str] = None
@@ -41,6 +87,11 @@ class ProductCategoryBase(BaseModel):
     ID_Category: int
 
 
+class ProductCategoryResponse(ProductCategoryBase):
+    class Config:
+        from_attributes = True
+
+
 class NotificationBase(BaseModel):
     ID_Product: int
     Min_Stock: int
@@ -85,6 +136,12 @@ class Token(BaseModel):
     ID_user: int
 
 
+class CurrentUser(BaseModel):
+    ID_user: int
+    Username: str
+    User_type: Optional[str] = None
+
+
 # Modelos Pydantic para validación
 class CartTransactionBase(BaseModel):
     ID_User: int
@@ -121,6 +178,19 @@ class TicketResponse(TicketBase):
         from_attributes = True
 
 
+class LowStockAlert(BaseModel):
+    ID_Notification: int
+    ID_Product: int
+    Min_Stock: int
+    Quantity: int
+
+
+class CheckoutResponse(TicketResponse):
+    count: int
+    low_stock: List[LowStockAlert] = []
+    timings: Dict[str, float]
+
+
 class TicketDetailResponse(TicketResponse):
     client_name: str
     user_name: str
@@ -154,11 +224,66 @@ class PromotionalCodeResponse(PromotionalCodeBase):
         from_attributes = True
 
 
+class PromotionalCodeLookup(PromotionalCodeResponse):
+    ExpirationDate: Optional[datetime] = None
+    valid: bool
+    expired: bool
+
+
 class CartUpdateRequest(BaseModel):
     ID_user: int
     ID_ticket: int
 
 
+# Sincronización de las cajas: cambios del catálogo y ventas hechas sin conexión
+class OfflineSaleLine(BaseModel):
+    ID_Product: int
+    Quantity: int = Field(..., gt=0)
+
+
+class OfflineSale(BaseModel):
+    Client_ref: str = Field(..., min_length=1, max_length=64)
+    ID_client: int
+    ID_user: int
+    ID_Code: Optional[int] = None
+    Issue_details: Optional[str] = None
+    Payment_method: str
+    Created_at: datetime
+    lines: List[OfflineSaleLine] = Field(..., min_length=1)
+
+
+class SyncRequest(BaseModel):
+    token: Optional[str] = None
+    sales: List[OfflineSale] = Field([], max_length=1000)
+
+
+class OfflineSaleResult(BaseModel):
+    Client_ref: str
+    status: str
+    ID_ticket: Optional[int] = None
+    Final_Price: Optional[float] = None
+    error: Optional[str] = None
+
+
+class SyncDeleted(BaseModel):
+    products: List[int] = []
+    categories: List[int] = []
+    product_categories: List[ProductCategoryBase] = []
+    promo_codes: List[int] = []
+
+
+class SyncResponse(BaseModel):
+    token: str
+    full: bool
+    products: List[ProductResponse]
+    categories: List[CategoryResponse]
+    product_categories: List[ProductCategoryResponse]
+    promo_codes: List[PromotionalCodeResponse]
+    deleted: SyncDeleted
+    sales: List[OfflineSaleResult]
+    low_stock: List[LowStockAlert] = []
+
+
 # Modelos Pydantic para respuestas
 class TotalSalesResponse(BaseModel):
     Venta_Total: float
@@ -176,6 +301,21 @@ class TopClientResponse(BaseModel):
     count: int
 
 
+class MonthlySalesResponse(BaseModel):
+    Year: int
+    Month: int
+    Tickets: int
+    Total: float
+
+
+class CategoryStatsResponse(BaseModel):
+    ID_Category: int
+    name: Optional[str] = None
+    Lines: int
+    Units: int
+    Revenue: float
+
+
 class UserBase(BaseModel):
     Username: str
     Phone: Optional[str] = None
@@ -1,10 +1,25 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime
 import jwt
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
-from config import ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
+from cache import TTLCache
+from config import ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM, BCRYPT_ROUNDS, HASH_WORKERS, \
+    HASH_MAX_PENDING, AUTH_CACHE_SIZE, AUTH_CACHE_TTL
+from schemas import CurrentUser
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Los hashes con un costo distinto al configurado se marcan para rehash
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 
 def create_access_token(data: dict):
@@ -15,4 +30,111 @@ def create_access_token(data: dict):
     to_encode.update({"exp": expire})
 
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+
+# Sello de versión del usuario: cambia cada vez que se modifica (UpdatedAt) y revoca sus tokens
+def user_version(updated_at):
+    return int(updated_at.timestamp() * 1000) if updated_at else 0
+
+
+def credentials_error(detail="Could not validate credentials"):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+# Tokens ya verificados (firma y claims) -> (expiración, versión, usuario)
+token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+# Versión vigente de cada usuario (ID_user -> sello); se invalida al actualizar el usuario
+user_versions = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+
+# Verificar un token; la firma solo se valida la primera vez que se ve el token
+def decode_access_token(token):
+    entry = token_cache.get(token)
+    if entry is None:
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.ExpiredSignatureError:
+            raise credentials_error("Token has expired")
+        except jwt.InvalidTokenError:
+            raise credentials_error()
+
+        # Los tokens emitidos antes de incluir uid/ver no se pueden revocar y se rechazan
+        if not isinstance(claims.get("uid"), int) or not isinstance(claims.get("ver"), int):
+            raise credentials_error()
+
+        user = CurrentUser(ID_user=claims["uid"], Username=claims["sub"], User_type=claims.get("role"))
+        entry = (claims["exp"], claims["ver"], user)
+        token_cache.set(token, entry)
+
+    if entry[0] < time.time():
+        raise credentials_error("Token has expired")
+
+    return entry
+
+
+# Servicio de hash con hilos dedicados: bcrypt no ocupa el threadpool compartido de las peticiones
+class PasswordHasher:
+    def __init__(self, context, workers, max_pending):
+        self.context = context
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_wait_ms = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many authentication requests, please retry",
+                    headers={"Retry-After": "1"}
+                )
+            self.pending += 1
+
+        queued_at = time.perf_counter()
+
+        def task():
+            wait_ms = (time.perf_counter() - queued_at) * 1000
+            with self._lock:
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            return fn(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, task)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    async def hash(self, password):
+        return await self._run(self.context.hash, password)
+
+    # Devuelve (válida, nuevo_hash); nuevo_hash no es None si hay que actualizar los parámetros
+    async def verify_and_update(self, password, hashed):
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "queue_depth": max(self.pending - self.workers, 0),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+            }
+
+
+hasher = PasswordHasher(pwd_context, HASH_WORKERS, HASH_MAX_PENDING)
@@ -0,0 +1,73 @@
+from collections import defaultdict
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models import Product, Notification
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, quantity):
+        super().__init__(f"Insufficient stock for product {product_id} (requested {quantity})")
+        self.product_id = product_id
+        self.quantity = quantity
+
+
+# Descontar el inventario de las líneas vendidas (filas con ID_Product y Quantity).
+# Cada UPDATE es condicional, así dos cajas no pueden vender la misma existencia.
+# Un producto sin existencia registrada (Quantity NULL) no se descuenta.
+# Devuelve las existencias resultantes y las alertas de stock mínimo que se cruzaron con esta venta.
+# Con allow_negative (ventas ya hechas sin conexión) se descuenta aunque la existencia no alcance.
+def decrement_stock(session: Session, rows, allow_negative=False):
+    quantities = defaultdict(int)
+    for row in rows:
+        if row.ID_Product is not None and row.Quantity:
+            quantities[row.ID_Product] += row.Quantity
+
+    # Productos con Quantity NULL: su inventario no se controla, se venden sin descontar ni alertar
+    if quantities:
+        untracked = set(session.scalars(
+            select(Product.ID_product).where(Product.ID_product.in_(quantities), Product.Quantity.is_(None))
+        ))
+        for product_id in untracked:
+            del quantities[product_id]
+
+    remaining = {}
+    # Orden fijo por producto para evitar bloqueos mutuos entre ventas concurrentes
+    for product_id, quantity in sorted(quantities.items()):
+        conditions = [Product.ID_product == product_id]
+        if not allow_negative:
+            conditions.append(Product.Quantity >= quantity)
+        new_quantity = session.execute(
+            update(Product)
+            .where(*conditions)
+            .values(Quantity=Product.Quantity - quantity)
+            .returning(Product.Quantity)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+
+        if new_quantity is None:
+            raise InsufficientStock(product_id, quantity)
+        remaining[product_id] = new_quantity
+
+    if not remaining:
+        return remaining, []
+
+    # Reglas de stock mínimo solo de los productos vendidos (índice ID_Product, Min_Stock)
+    rules = session.execute(
+        select(Notification.ID_Notification, Notification.ID_Product, Notification.Min_Stock)
+        .where(Notification.ID_Product.in_(remaining))
+    ).all()
+
+    alerts = [
+        {
+            "ID_Notification": rule.ID_Notification,
+            "ID_Product": rule.ID_Product,
+            "Min_Stock": rule.Min_Stock,
+            "Quantity": remaining[rule.ID_Product]
+        }
+        for rule in rules
+        if rule.Min_Stock is not None
+        and remaining[rule.ID_Product] <= rule.Min_Stock < remaining[rule.ID_Product] + quantities[rule.ID_Product]
+    ]
+    return remaining, alerts
@@ -0,0 +1,83 @@
+import itertools
+import threading
+import time
+import uuid
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import ETAG_WINDOW
+
+# Identificador del proceso: las ETags de otro worker o de un reinicio nunca coinciden
+EPOCH = uuid.uuid4().hex[:8]
+
+# Contadores de versión por tabla (se incrementan después de cada commit que la modifica)
+_versions = {}
+_lock = threading.Lock()
+_counter = itertools.count(1)
+
+
+def bump(*tables):
+    with _lock:
+        for table in tables:
+            _versions[table] = next(_counter)
+
+
+def version(*tables):
+    with _lock:
+        return tuple(_versions.get(table, 0) for table in tables)
+
+
+# Registrar las tablas modificadas por cada sesión
+def _touched(session):
+    return session.info.setdefault("touched_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        _touched(session).add(instance.__table__.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _touched(orm_execute_state.session).add(orm_execute_state.statement.table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed(session):
+    tables = session.info.pop("touched_tables", None)
+    if tables:
+        bump(*tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("touched_tables", None)
+
+
+# ETag fuerte a partir de las versiones de las tablas (sin consultar ni serializar la respuesta).
+# La ventana de tiempo limita cuánto puede durar una ETag si otro worker modificó los datos.
+def etag(*tables):
+    window = int(time.time() // ETAG_WINDOW)
+    return '"{}-{}-{}"'.format(EPOCH, window, ".".join(map(str, version(*tables))))
+
+
+def _matches(tag, if_none_match):
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or tag in candidates or f"W/{tag}" in candidates
+
+
+# Dependencia para GET condicionales: responde 304 antes de ejecutar la consulta
+def conditional(*tables):
+    def dependency(request: Request, response: Response):
+        tag = etag(*tables)
+        if _matches(tag, request.headers.get("if-none-match")):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+        response.headers["ETag"] = tag
+
+    return dependency